@@ -7,14 +7,23 @@ DEFAULT_API_CONFIG = {
             "name": "Weather",
             "provider": "OpenWeatherMap",
             "key": os.getenv("OPENWEATHER_API_KEY"),
-            "default_location": "Manassas,VA,US"
+            "default_location": "Manassas,VA,US",
+            "cache_ttl": 600,
+            "max_stale": 3600
         },
         "stocks": {
             "enabled": True,
             "name": "Stocks",
             "provider": "Alpha Vantage",
             "key": "default_key",
-            "default_symbol": "AAPL"
+            "default_symbol": "AAPL",
+            "cache_ttl": 60,
+            "requests_per_minute": 5,
+            "batch": False,
+            "batch_window": 0.05,
+            "max_wait": 15,
+            "symbols_csv": "patriot-buddy/symbols.csv",
+            "symbols_index": "patriot-buddy/symbols.idx"
         },
         "news": {
             "enabled": False,
@@ -57,5 +66,123 @@ DEFAULT_API_CONFIG = {
             "provider": "Local Reminders",
             "storage": "reminders.json"
         }
+    },
+    "ollama": {
+        "url": "http://localhost:11434",
+        "model": "mistral",
+        "connect_timeout": 3.05,
+        "read_timeout": 120,
+        "pool_size": 4,
+        "max_in_flight": 2,
+        "chat_slots": 1
+    },
+    "ui": {
+        "stream_responses": True,
+        "stream_interval_ms": 50
+    },
+    "tts": {
+        "model_id": "eleven_multilingual_v2",
+        "output_format": "mp3_44100_128",
+        "stability": 0.5,
+        "similarity_boost": 0.75
+    },
+    "intent_classifier": {
+        "enabled": True,
+        "model_path": "patriot-buddy/intent_model.json",
+        "log_path": "patriot-buddy/intent_log.jsonl",
+        "threshold": 0.9
+    },
+    "transcript_cache": {
+        "enabled": True,
+        "max_entries": 512,
+        "ttl": 86400,
+        "persist_path": "patriot-buddy/transcript_cache.json"
+    },
+    "tts_cache": {
+        "enabled": True,
+        "directory": "patriot-buddy/.tts_cache",
+        "max_bytes": 52428800,
+        "prewarm": True
+    },
+    "prefetch": {
+        "enabled": True,
+        "tick": 30,
+        "interval": 540,
+        "idle_interval": 3600,
+        "lead_minutes": 15,
+        "min_usage": 3,
+        "profile_path": "patriot-buddy/usage_profile.json"
+    },
+    "executor": {
+        "listen": {"workers": 1, "queue": 1},
+        "command": {"workers": 2, "queue": 4},
+        "tts": {"workers": 2, "queue": 4},
+        "playback": {"workers": 1, "queue": 4},
+        "background": {"workers": 2, "queue": 16},
+        "devices": {"workers": 24, "queue": 64},
+        "speculation": {"workers": 2, "queue": 4}
+    },
+    "listener": {
+        "microphone": True,
+        "sample_rate": 16000,
+        "chunk": 480,
+        "buffer_seconds": 20,
+        "pre_roll": 0.3,
+        "end_silence": 0.8,
+        "start_timeout": 5,
+        "max_utterance": 15,
+        "speech_ratio": 2.5,
+        "min_energy": 150,
+        "noise_adapt": 0.05
+    },
+    "wake_word": {
+        "enabled": False,
+        "phrase": "patriot buddy",
+        "sensitivity": 0.5,
+        "cpu_budget": 0.15,
+        "gate_ratio": 1.5,
+        "min_energy": 100,
+        "hangover": 0.6
+    },
+    "stt": {
+        "backend": "google",
+        "language": "en-US",
+        "model_path": "patriot-buddy/vosk-model-small-en-us-0.15"
+    },
+    "tracing": {
+        "enabled": True,
+        "path": "patriot-buddy/traces.jsonl",
+        "max_bytes": 1000000,
+        "backups": 3,
+        "prometheus_path": "",
+        "overlay": False
+    },
+    "conversation": {
+        "enabled": True,
+        "max_context_tokens": 2048,
+        "max_turns": 12,
+        "max_sessions": 8,
+        "idle_timeout": 900
+    },
+    "speculation": {
+        "enabled": False,
+        "min_probability": 0.25,
+        "timeout": 10
+    },
+    "devices": {
+        "timeout": 3,
+        "debounce": 0.3,
+        "ifttt_url": "https://maker.ifttt.com",
+        "mqtt": {"host": "localhost", "port": 1883, "username": "", "password": ""},
+        "devices": {
+            "plug": {
+                "name": "lights",
+                "room": "",
+                "groups": ["lights"],
+                "driver": "ifttt",
+                "on_event": "PLUGON",
+                "off_event": "PLUGOFF"
+            }
+        }
     }
 }
\ No newline at end of file
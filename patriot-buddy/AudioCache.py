@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_TTS_CACHE_CONFIG = {
+    "enabled": True,
+    "directory": "patriot-buddy/.tts_cache",
+    "max_bytes": 50 * 1024 * 1024,
+    "prewarm": True
+}
+
+
+class AudioCache:
+    """Content-addressed on-disk cache of synthesized speech with LRU eviction under a byte budget"""
+
+    def __init__(self, directory=DEFAULT_TTS_CACHE_CONFIG["directory"],
+                 max_bytes=DEFAULT_TTS_CACHE_CONFIG["max_bytes"]):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.files = OrderedDict()  # key -> size, least recently used first
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a cache from the "tts_cache" section, or None when it is disabled"""
+        settings = dict(DEFAULT_TTS_CACHE_CONFIG)
+        settings.update(config.get("tts_cache", {}))
+        if not settings["enabled"]:
+            return None
+        return cls(settings["directory"], settings["max_bytes"])
+
+    @staticmethod
+    def key(text, voice_id, model_id, output_format, voice_settings):
+        """Hash of everything that affects the synthesized audio"""
+        material = json.dumps([text, voice_id, model_id, output_format, voice_settings], sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".audio")
+
+    def _scan(self):
+        """Rebuild the LRU order from file modification times left by earlier runs"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".audio"):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, name[:-len(".audio")], stat.st_size))
+        for _, key, size in sorted(entries):
+            self.files[key] = size
+            self.total_bytes += size
+
+    def get(self, key):
+        """Return cached audio bytes, or None on a miss"""
+        with self._lock:
+            if key not in self.files:
+                self.misses += 1
+                return None
+            self.files.move_to_end(key)
+            self.hits += 1
+        try:
+            path = self._path(key)
+            os.utime(path)  # Keeps the LRU order across restarts
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            with self._lock:
+                self.total_bytes -= self.files.pop(key, 0)
+            return None
+
+    def put(self, key, audio):
+        if len(audio) > self.max_bytes:
+            return
+        path = self._path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(audio)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Error writing TTS cache entry: {e}")
+            return
+
+        with self._lock:
+            self.total_bytes += len(audio) - self.files.pop(key, 0)
+            self.files[key] = len(audio)
+            while self.total_bytes > self.max_bytes:
+                old_key, size = self.files.popitem(last=False)
+                self.total_bytes -= size
+                try:
+                    os.remove(self._path(old_key))
+                except OSError:
+                    pass
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self.files
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self.files),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
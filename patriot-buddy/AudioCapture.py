@@ -0,0 +1,204 @@
+import array
+import math
+import threading
+import time
+from collections import deque
+import speech_recognition as sr
+from Callbacks import Callbacks
+
+DEFAULT_CAPTURE_CONFIG = {
+    "microphone": True,
+    "sample_rate": 16000,
+    "chunk": 480,
+    "buffer_seconds": 20,
+    "pre_roll": 0.3,
+    "end_silence": 0.8,
+    "start_timeout": 5,
+    "max_utterance": 15,
+    "speech_ratio": 2.5,
+    "min_energy": 150,
+    "noise_adapt": 0.05
+}
+
+SAMPLE_TYPECODES = {1: "b", 2: "h", 4: "i"}
+
+
+def rms(frame, sample_width=2):
+    """Root-mean-square level of a frame of signed native-endian PCM samples, as audioop.rms gave"""
+    samples = array.array(SAMPLE_TYPECODES[sample_width])
+    samples.frombytes(frame[:len(frame) - len(frame) % sample_width])
+    if not samples:
+        return 0
+    return int(math.sqrt(sum(sample * sample for sample in samples) / len(samples)))
+
+
+class AudioCapture:
+    """
+    Keeps one microphone stream open for the life of the app. Every frame is numbered,
+    kept in a ring buffer and handed to subscribers on the capture thread.
+    """
+
+    def __init__(self, sample_rate=DEFAULT_CAPTURE_CONFIG["sample_rate"],
+                 chunk=DEFAULT_CAPTURE_CONFIG["chunk"],
+                 buffer_seconds=DEFAULT_CAPTURE_CONFIG["buffer_seconds"]):
+        self.sample_rate = sample_rate
+        self.chunk = chunk
+        self.sample_width = 2
+        self.frame_duration = chunk / sample_rate
+        self.frames = deque(maxlen=int(buffer_seconds / self.frame_duration))  # (seq, frame)
+        self.next_seq = 0
+        self.subscribers = []
+        self.opened_at = None
+        self.open_started = None
+        self.open_duration = None
+        self.error = None  # Why the stream could not be opened or stopped delivering frames
+        self.failed = Callbacks()  # Emitted with the exception when the stream fails
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback):
+        """callback(seq, frame) is called on the capture thread for every frame"""
+        with self._lock:
+            self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="audio-capture", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def frames_between(self, start_seq, end_seq):
+        """Return the buffered frames from start_seq up to (not including) end_seq"""
+        with self._lock:
+            return [frame for seq, frame in self.frames if start_seq <= seq < end_seq]
+
+    def cut(self, start_seq, end_seq):
+        """Return the frames from start_seq up to (not including) end_seq as AudioData"""
+        data = b"".join(self.frames_between(start_seq, end_seq))
+        return sr.AudioData(data, self.sample_rate, self.sample_width)
+
+    def _run(self):
+        started = time.perf_counter()
+        self.open_started = started
+        try:
+            with sr.Microphone(sample_rate=self.sample_rate, chunk_size=self.chunk) as source:
+                self.sample_width = source.SAMPLE_WIDTH
+                self.open_duration = time.perf_counter() - started
+                self.opened_at = time.time()
+                while not self._stop.is_set():
+                    self.push(source.stream.read(self.chunk))
+        except Exception as e:
+            print(f"Error capturing audio: {e}")
+            self.error = e
+            self.failed.emit(e)
+
+    def push(self, frame):
+        """Buffer a frame and hand it to the subscribers; also used to replay recordings"""
+        with self._lock:
+            seq = self.next_seq
+            self.next_seq += 1
+            self.frames.append((seq, frame))
+            subscribers = list(self.subscribers)
+        for callback in subscribers:
+            try:
+                callback(seq, frame)
+            except Exception as e:
+                print(f"Error handling audio frame: {e}")
+
+
+class Endpointer:
+    """
+    Frame-based voice activity detection. The noise floor is tracked continuously from
+    non-speech frames, so no calibration pause is needed before listening.
+    """
+
+    def __init__(self, frame_duration, sample_width=2, pre_roll=DEFAULT_CAPTURE_CONFIG["pre_roll"],
+                 end_silence=DEFAULT_CAPTURE_CONFIG["end_silence"],
+                 start_timeout=DEFAULT_CAPTURE_CONFIG["start_timeout"],
+                 max_utterance=DEFAULT_CAPTURE_CONFIG["max_utterance"],
+                 speech_ratio=DEFAULT_CAPTURE_CONFIG["speech_ratio"],
+                 min_energy=DEFAULT_CAPTURE_CONFIG["min_energy"],
+                 noise_adapt=DEFAULT_CAPTURE_CONFIG["noise_adapt"]):
+        self.sample_width = sample_width
+        self.pre_roll_frames = int(pre_roll / frame_duration)
+        self.end_silence_frames = max(1, int(end_silence / frame_duration))
+        self.start_timeout_frames = int(start_timeout / frame_duration)
+        self.max_frames = int(max_utterance / frame_duration)
+        self.start_frames = max(1, int(0.09 / frame_duration))  # Speech must last ~90 ms to count
+        self.speech_ratio = speech_ratio
+        self.min_energy = min_energy
+        self.noise_adapt = noise_adapt
+
+        self.noise_floor = None
+        self.armed = False
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.armed_seq = None
+        self.start_seq = None
+        self.loud_run = 0
+        self.quiet_run = 0
+
+    def arm(self):
+        """Start looking for the next utterance"""
+        with self._lock:
+            self._reset()
+            self.armed = True
+
+    def disarm(self):
+        with self._lock:
+            self.armed = False
+            self._reset()
+
+    @property
+    def threshold(self):
+        return max(self.min_energy, (self.noise_floor or 0) * self.speech_ratio)
+
+    def process(self, seq, frame):
+        """
+        Feed one frame. Returns None, "speech" when speech starts, "timeout" if nobody spoke in time,
+        or ("utterance", start_seq, end_seq) once the speaker has stopped.
+        """
+        energy = rms(frame, self.sample_width)
+        with self._lock:
+            is_loud = energy > self.threshold
+            in_speech = self.start_seq is not None
+            if not in_speech and (not is_loud or not self.armed):
+                # Incremental noise-floor estimate from frames that are not part of an utterance
+                if self.noise_floor is None:
+                    self.noise_floor = energy
+                else:
+                    self.noise_floor += (energy - self.noise_floor) * self.noise_adapt
+
+            if not self.armed:
+                return None
+            if self.armed_seq is None:
+                self.armed_seq = seq
+
+            if not in_speech:
+                self.loud_run = self.loud_run + 1 if is_loud else 0
+                if self.loud_run >= self.start_frames:
+                    self.start_seq = seq - self.loud_run - self.pre_roll_frames + 1
+                    return "speech"
+                if seq - self.armed_seq >= self.start_timeout_frames:
+                    self.armed = False
+                    self._reset()
+                    return "timeout"
+                return None
+
+            self.quiet_run = 0 if is_loud else self.quiet_run + 1
+            if self.quiet_run >= self.end_silence_frames or seq - self.start_seq >= self.max_frames:
+                result = ("utterance", self.start_seq, seq + 1)
+                self.armed = False
+                self._reset()
+                return result
+            return None
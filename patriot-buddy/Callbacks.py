@@ -0,0 +1,30 @@
+import threading
+
+
+class Callbacks:
+    """
+    Minimal stand-in for a Qt signal so the pipeline can run without Qt.
+    connect/disconnect/emit mirror the Signal API; callbacks run on the emitting thread.
+    """
+
+    def __init__(self):
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def connect(self, callback):
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def disconnect(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def emit(self, *args):
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Error in callback: {e}")
@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+DEFAULT_CONVERSATION_CONFIG = {
+    "enabled": True,
+    "max_context_tokens": 2048,
+    "max_turns": 12,
+    "max_sessions": 8,
+    "idle_timeout": 900
+}
+
+SYSTEM_PROMPT = ("You are Patriot Buddy, a friendly and helpful assistant. "
+                 "You should keep your responses brief and to the point, in 50 words or less.")
+
+# Rough size of a token in characters, for budgeting history that has to be re-sent as text
+CHARS_PER_TOKEN = 4
+
+
+class Conversation:
+    """
+    One session's chat state. Ollama's returned context is passed back each turn, so earlier
+    turns are not re-tokenized; the text of recent turns is kept to rebuild it when it gets too long.
+    """
+
+    def __init__(self, max_context_tokens, max_turns):
+        self.max_context_tokens = max_context_tokens
+        self.context = None
+        self.turns = deque(maxlen=max_turns)  # (user, assistant) text
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()  # One turn at a time per session
+
+    def request(self, prompt):
+        """The prompt and extra generate fields for the next turn"""
+        if self.context and len(self.context) <= self.max_context_tokens:
+            return prompt, {"context": self.context}
+
+        # First turn, or the context outgrew the budget: start over from the most recent turns
+        self.context = None
+        budget = self.max_context_tokens // 2 * CHARS_PER_TOKEN
+        history = []
+        for user, assistant in reversed(self.turns):
+            turn = f"User: {user}\nPatriot Buddy: {assistant}"
+            budget -= len(turn)
+            if budget < 0:
+                break
+            history.insert(0, turn)
+        if history:
+            prompt = "Earlier in this conversation:\n" + "\n".join(history) + f"\n\nUser: {prompt}"
+        return prompt, {"system": SYSTEM_PROMPT}
+
+    def record(self, prompt, response, context):
+        """Remember a completed turn and the context Ollama returned for it"""
+        self.turns.append((prompt, response))
+        self.context = context or None
+        self.last_used = time.monotonic()
+
+
+class ConversationStore:
+    """Conversations by session, least recently used dropped first and idle ones forgotten"""
+
+    def __init__(self, max_context_tokens=DEFAULT_CONVERSATION_CONFIG["max_context_tokens"],
+                 max_turns=DEFAULT_CONVERSATION_CONFIG["max_turns"],
+                 max_sessions=DEFAULT_CONVERSATION_CONFIG["max_sessions"],
+                 idle_timeout=DEFAULT_CONVERSATION_CONFIG["idle_timeout"]):
+        self.max_context_tokens = max_context_tokens
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Build the store from the "conversation" section, or return None if it is disabled"""
+        settings = dict(DEFAULT_CONVERSATION_CONFIG)
+        settings.update(config.get("conversation", {}))
+        if not settings["enabled"]:
+            return None
+        return cls(settings["max_context_tokens"], settings["max_turns"], settings["max_sessions"],
+                   settings["idle_timeout"])
+
+    def get(self, session):
+        with self._lock:
+            conversation = self.sessions.pop(session, None)
+            if conversation is None or time.monotonic() - conversation.last_used > self.idle_timeout:
+                conversation = Conversation(self.max_context_tokens, self.max_turns)
+            self.sessions[session] = conversation
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+            return conversation
+
+    def forget(self, session):
+        with self._lock:
+            self.sessions.pop(session, None)
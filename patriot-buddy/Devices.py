@@ -0,0 +1,465 @@
+import socket
+import struct
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from Executor import StageBusy
+from Tracing import span
+
+DEFAULT_DEVICES_CONFIG = {
+    "timeout": 3,
+    "debounce": 0.3,
+    "ifttt_url": "https://maker.ifttt.com",
+    "mqtt": {"host": "localhost", "port": 1883, "username": "", "password": ""},
+    "devices": {
+        "plug": {
+            "name": "lights",
+            "room": "",
+            "groups": ["lights"],
+            "driver": "ifttt",
+            "on_event": "PLUGON",
+            "off_event": "PLUGOFF"
+        }
+    }
+}
+
+FILLER_WORDS = {"the", "all", "my", "of", "in", "every", "both"}
+EVERYTHING = {"everything", "devices", "device"}
+
+
+def words(text):
+    """Lowercase words with filler removed and plurals folded, so "all the Lights" matches "light" """
+    result = []
+    for word in (text or "").lower().replace("_", " ").replace("-", " ").split():
+        if word in FILLER_WORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        result.append(word)
+    return result
+
+
+class IftttDriver:
+    """Cloud IFTTT webhooks: one event per state"""
+
+    def __init__(self, session, url, key, on_event, off_event, timeout):
+        self.session = session
+        self.url = url.rstrip("/")
+        self.key = key
+        self.events = {"ON": on_event, "OFF": off_event}
+        self.timeout = timeout
+
+    def send(self, state):
+        response = self.session.post(f"{self.url}/trigger/{self.events[state]}/with/key/{self.key}",
+                                     timeout=self.timeout)
+        return response.status_code == 200
+
+
+class HttpDriver:
+    """
+    Local HTTP devices. Either on_url/off_url are requested as-is (Shelly, Tasmota, ...),
+    or url is sent {"state": "on"|"off"} as JSON.
+    """
+
+    def __init__(self, session, settings, timeout):
+        self.session = session
+        self.settings = settings
+        self.method = settings.get("method", "POST").upper()
+        self.timeout = timeout
+
+    def send(self, state):
+        url = self.settings.get(f"{state.lower()}_url")
+        if url:
+            response = self.session.request(self.method, url, timeout=self.timeout)
+        else:
+            response = self.session.request(self.method, self.settings["url"], json={"state": state.lower()},
+                                            timeout=self.timeout)
+        return 200 <= response.status_code < 300
+
+
+class MqttDriver:
+    """Publishes the state payload to the device's command topic"""
+
+    def __init__(self, client, settings):
+        self.client = client
+        self.topic = settings["topic"]
+        self.payloads = {"ON": settings.get("on_payload", "ON"), "OFF": settings.get("off_payload", "OFF")}
+
+    def send(self, state):
+        return self.client.publish(self.topic, self.payloads[state])
+
+
+class MqttClient:
+    """
+    Minimal MQTT 3.1.1 publisher using QoS 1. One connection is shared by every MQTT device;
+    publishes are pipelined, so a group command waits for all acknowledgements at once.
+    """
+
+    def __init__(self, host, port=1883, username="", password="", timeout=3, client_id="patriot-buddy"):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.client_id = client_id
+        self.sock = None
+        self.next_id = 1
+        self.waiting = {}  # packet id -> Event set by the PUBACK
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _string(value):
+        data = value.encode()
+        return struct.pack("!H", len(data)) + data
+
+    @staticmethod
+    def _packet(header, body):
+        length = len(body)
+        encoded = bytearray()
+        while True:
+            byte, length = length % 128, length // 128
+            encoded.append(byte | (0x80 if length else 0))
+            if not length:
+                break
+        return bytes([header]) + bytes(encoded) + body
+
+    @staticmethod
+    def _read_exact(sock, size, idle=False):
+        """Read size bytes; with idle, timeouts before the first byte just mean nothing was sent"""
+        data = b""
+        while len(data) < size:
+            try:
+                chunk = sock.recv(size - len(data))
+            except socket.timeout:
+                if idle and not data:
+                    continue
+                raise
+            if not chunk:
+                raise ConnectionError("MQTT broker closed the connection")
+            data += chunk
+        return data
+
+    def _read_packet(self, sock, idle=False):
+        header = self._read_exact(sock, 1, idle)[0]
+        length, multiplier = 0, 1
+        while True:
+            byte = self._read_exact(sock, 1)[0]
+            length += (byte & 0x7F) * multiplier
+            multiplier *= 128
+            if not byte & 0x80:
+                break
+        return header, self._read_exact(sock, length)
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        flags = 0x02  # Clean session
+        payload = self._string(self.client_id)
+        if self.username:
+            flags |= 0x80
+            payload += self._string(self.username)
+            if self.password:
+                flags |= 0x40
+                payload += self._string(self.password)
+        # Keep-alive 0: the broker never drops an idle connection, and a dead one is reopened on the next publish
+        body = self._string("MQTT") + bytes([4, flags]) + struct.pack("!H", 0) + payload
+        try:
+            sock.sendall(self._packet(0x10, body))
+            header, body = self._read_packet(sock)
+        except OSError:
+            sock.close()
+            raise
+        if header >> 4 != 2 or body[1] != 0:
+            sock.close()
+            raise ConnectionError(f"MQTT broker refused the connection (code {body[1] if len(body) > 1 else '?'})")
+        # The socket keeps its timeout, so a broker that stops reading cannot block a publish for ever
+        threading.Thread(target=self._read_loop, args=(sock,), name="mqtt-reader", daemon=True).start()
+        return sock
+
+    def _read_loop(self, sock):
+        try:
+            while True:
+                header, body = self._read_packet(sock, idle=True)
+                if header >> 4 == 4:  # PUBACK
+                    packet_id = struct.unpack("!H", body[:2])[0]
+                    with self._lock:
+                        acked = self.waiting.pop(packet_id, None)
+                    if acked is not None:
+                        acked.set()
+        except Exception:
+            with self._lock:
+                self._drop(sock)
+
+    def _drop(self, sock):
+        """Forget a dead connection so the next publish opens a new one; called with the lock held"""
+        if self.sock is sock:
+            self.sock = None
+        try:
+            sock.shutdown(socket.SHUT_RDWR)  # Wakes the reader thread
+        except OSError:
+            pass
+        sock.close()
+
+    def publish(self, topic, payload):
+        """Publish and wait for the broker's acknowledgement; returns False on failure"""
+        for attempt in range(2):
+            acked = threading.Event()
+            with self._lock:
+                if self.sock is None:
+                    self.sock = self._connect()
+                sock = self.sock
+                packet_id = self.next_id
+                self.next_id = self.next_id % 65535 + 1
+                self.waiting[packet_id] = acked
+                body = self._string(topic) + struct.pack("!H", packet_id) + str(payload).encode()
+                try:
+                    sock.sendall(self._packet(0x32, body))
+                except OSError:  # Including a timeout: the broker stopped reading
+                    self.waiting.pop(packet_id, None)
+                    self._drop(sock)
+                    if attempt:
+                        raise
+                    continue  # Once more on a fresh connection
+            if acked.wait(self.timeout):
+                return True
+            with self._lock:
+                self.waiting.pop(packet_id, None)
+                # A half-open connection still accepts writes, so a missing acknowledgement is the sign
+                self._drop(sock)
+            return False
+
+    def close(self):
+        with self._lock:
+            if self.sock is not None:
+                try:
+                    self.sock.sendall(b"\xe0\x00")  # DISCONNECT
+                except OSError:
+                    pass
+                self._drop(self.sock)
+
+
+class Device:
+    def __init__(self, device_id, name, room, groups, driver):
+        self.id = device_id
+        self.name = name
+        self.room = room
+        self.groups = groups
+        self.driver = driver
+        self.words = words(name)
+        self.room_words = words(room)
+        self.group_words = [words(group) for group in groups]
+
+
+class _Command:
+    """A state change for one device that concurrent callers can wait on together"""
+
+    def __init__(self, state):
+        self.state = state
+        self.done = threading.Event()
+        self.result = None  # The state that was applied, or None if the send failed
+
+
+class _DeviceLane:
+    """Per-device bookkeeping for debouncing: what is being sent and what should follow it"""
+
+    def __init__(self):
+        self.in_flight = None
+        self.pending = None
+        self.applied = None  # The state last confirmed by the device, or None if unknown
+        self.last_sent = 0.0
+
+
+class DeviceRegistry:
+    """
+    Rooms, groups and devices from the "devices" config section, and concurrent dispatch to them.
+    Repeated commands to a device are coalesced: the same state within the debounce window is not
+    sent again, and rapid toggles collapse into a single send of the latest state.
+    """
+
+    def __init__(self, devices, executor=None, debounce=DEFAULT_DEVICES_CONFIG["debounce"],
+                 timeout=DEFAULT_DEVICES_CONFIG["timeout"], mqtt=None):
+        self.devices = devices
+        self.executor = executor
+        self.debounce = debounce
+        self.timeout = timeout
+        self.mqtt = mqtt
+        self.lanes = {device.id: _DeviceLane() for device in devices}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, executor=None, ifttt_key=None):
+        settings = dict(DEFAULT_DEVICES_CONFIG)
+        settings.update(config.get("devices", {}))
+        timeout = settings["timeout"]
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        mqtt = None
+
+        devices = []
+        for device_id, device in settings["devices"].items():
+            kind = device.get("driver", "http")
+            try:
+                if kind == "ifttt":
+                    driver = IftttDriver(session, device.get("url", settings["ifttt_url"]), ifttt_key,
+                                         device["on_event"], device["off_event"], timeout)
+                elif kind == "http":
+                    driver = HttpDriver(session, device, timeout)
+                elif kind == "mqtt":
+                    if mqtt is None:
+                        broker = dict(DEFAULT_DEVICES_CONFIG["mqtt"])
+                        broker.update(settings.get("mqtt", {}))
+                        mqtt = MqttClient(broker["host"], broker["port"], broker["username"],
+                                          broker["password"], timeout)
+                    driver = MqttDriver(mqtt, device)
+                else:
+                    raise ValueError(f"unknown driver {kind}")
+            except Exception as e:
+                print(f"Error setting up device {device_id}: {e}")
+                continue
+            devices.append(Device(device_id, device.get("name", device_id), device.get("room", ""),
+                                  device.get("groups", []), driver))
+        return cls(devices, executor, settings["debounce"], timeout, mqtt)
+
+    def names(self):
+        """Everything a command can be addressed to: devices, groups and rooms"""
+        names = set()
+        for device in self.devices:
+            names.add(device.name)
+            names.update(device.groups)
+            if device.room:
+                names.add(device.room)
+        return sorted(names)
+
+    def targets(self):
+        """Every name a command can use, including room-qualified ones like "kitchen lights" """
+        targets = set(self.names())
+        for device in self.devices:
+            if device.room:
+                targets.add(f"{device.room} {device.name}")
+                targets.update(f"{device.room} {group}" for group in device.groups)
+        return sorted(targets)
+
+    def resolve(self, target, room=None):
+        """
+        Return the devices a spoken target refers to, e.g. "lights", "kitchen lights",
+        "the bedroom fan" or "everything". A room given separately narrows the match.
+        """
+        target_words = words(target)
+        candidates = self.devices
+        in_room = bool(room)
+        if room:
+            candidates = [device for device in candidates if device.room_words == words(room)]
+
+        # A room named inside the target ("kitchen lights") narrows the candidates too
+        for device in candidates:
+            room_words = device.room_words
+            if room_words and target_words[:len(room_words)] == room_words:
+                target_words = target_words[len(room_words):]
+                candidates = [other for other in candidates if other.room_words == room_words]
+                in_room = True
+                break
+
+        if not target_words:
+            # A bare room ("turn off the kitchen") means everything in it
+            return list(candidates) if in_room else []
+        if set(target_words) <= EVERYTHING:
+            return list(candidates)
+        return [device for device in candidates
+                if device.words == target_words or target_words in device.group_words
+                or device.id == "_".join(target_words)]
+
+    def command(self, devices, state, ctx=None):
+        """
+        Switch devices ON or OFF concurrently.
+        Returns the state each device was left in, which a later command may have changed,
+        or None for devices that did not confirm it.
+        """
+        with span(ctx, "devices", state=state, devices=len(devices)) as attrs:
+            applied = self._dispatch(devices, state)
+            if attrs is not None:
+                attrs["succeeded"] = applied.count(state)
+        return applied
+
+    def _dispatch(self, devices, state):
+        futures = []
+        for device in devices:
+            if self.executor is not None:
+                try:
+                    futures.append(self.executor.submit("devices", self.set_state, device, state))
+                    continue
+                except StageBusy:
+                    pass
+            futures.append(None)
+        applied = []
+        deadline = time.monotonic() + self.timeout * 2 + self.debounce
+        for device, future in zip(devices, futures):
+            try:
+                if future is None:
+                    result = self.set_state(device, state)
+                else:
+                    result = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except Exception as e:
+                print(f"Error controlling {device.name}: {e}")
+                result = None
+            applied.append(result)
+        return applied
+
+    def set_state(self, device, state):
+        """
+        Send one device a state, sharing the send with identical or superseded commands.
+        Returns the state the device was left in, or None if the send failed.
+        """
+        lane = self.lanes[device.id]
+        with self._lock:
+            if lane.pending is not None:
+                # A send is queued behind the one in flight; the latest state wins
+                lane.pending.state = state
+                command, leader = lane.pending, False
+            elif lane.in_flight is not None:
+                if lane.in_flight.state == state:
+                    command, leader = lane.in_flight, False
+                else:
+                    lane.pending = command = _Command(state)
+                    leader = False
+            elif lane.applied == state and time.monotonic() - lane.last_sent < self.debounce:
+                return state  # Just sent; a repeat would only add traffic
+            else:
+                lane.in_flight = command = _Command(state)
+                leader = True
+
+        if not leader:
+            command.done.wait(self.timeout * 2 + self.debounce)
+            return command.result
+
+        while True:
+            try:
+                ok = bool(device.driver.send(command.state))
+            except Exception as e:
+                print(f"Error sending {command.state} to {device.name}: {e}")
+                ok = False
+            with self._lock:
+                command.result = lane.applied = command.state if ok else None
+                lane.last_sent = time.monotonic()
+                lane.in_flight = None
+                command.done.set()
+                command = lane.pending
+                if command is None:
+                    return lane.applied
+
+            # Let a burst of toggles settle before sending the state it ended on; it stays pending meanwhile
+            time.sleep(self.debounce)
+            with self._lock:
+                lane.pending = None
+                if command.state == lane.applied:
+                    # The burst ended where the device already is
+                    command.result = lane.applied
+                    command.done.set()
+                    return lane.applied
+                lane.in_flight = command
+
+    def close(self):
+        if self.mqtt is not None:
+            self.mqtt.close()
@@ -0,0 +1,122 @@
+import queue
+import threading
+from concurrent.futures import Future
+
+DEFAULT_EXECUTOR_CONFIG = {
+    "listen": {"workers": 1, "queue": 1},
+    "command": {"workers": 2, "queue": 4},
+    "tts": {"workers": 2, "queue": 4},
+    "playback": {"workers": 1, "queue": 4},
+    "background": {"workers": 2, "queue": 16},
+    "devices": {"workers": 24, "queue": 64},
+    "speculation": {"workers": 2, "queue": 4}
+}
+
+
+class StageBusy(Exception):
+    """Raised when a stage's queue is full, so callers can shed load instead of piling up threads"""
+
+
+class Stage:
+    """Up to `workers` threads fed by a bounded queue; a thread is only started when none is free"""
+
+    def __init__(self, name, workers, queue_size):
+        self.name = name
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.workers = workers
+        self.threads = 0
+        self.idle = 0  # Threads waiting for a task that no submit has claimed yet
+        self.unclaimed = 0  # Queued tasks left for the next thread to finish its current one
+        self.active = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_queued = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) and return a Future, or raise StageBusy if the queue is full"""
+        future = Future()
+        with self._lock:
+            try:
+                self.queue.put_nowait((future, fn, args, kwargs))
+            except queue.Full:
+                self.rejected += 1
+                raise StageBusy(f"The {self.name} stage is busy")
+            self.submitted += 1
+            self.max_queued = max(self.max_queued, self.queue.qsize())
+            if self.idle:
+                self.idle -= 1
+            elif self.threads < self.workers:
+                threading.Thread(target=self._work, name=f"{self.name}-{self.threads}", daemon=True).start()
+                self.threads += 1
+            else:
+                self.unclaimed += 1
+        return future
+
+    def _work(self):
+        while True:
+            self._run(*self.queue.get())
+            with self._lock:
+                if self.unclaimed:
+                    self.unclaimed -= 1
+                else:
+                    self.idle += 1
+
+    def _run(self, future, fn, args, kwargs):
+        if not future.set_running_or_notify_cancel():
+            return
+        with self._lock:
+            self.active += 1
+        try:
+            future.set_result(fn(*args, **kwargs))
+            failed = False
+        except BaseException as e:
+            print(f"Error in {self.name} task: {e}")
+            future.set_exception(e)
+            failed = True
+        with self._lock:
+            self.active -= 1
+            self.completed += 1
+            self.failed += failed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "threads": self.threads,
+                "active": self.active,
+                "queued": self.queue.qsize(),
+                "max_queued": self.max_queued,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected
+            }
+
+
+class Executor:
+    """
+    Central execution layer: one bounded stage per kind of work, so the number of threads
+    stays capped no matter how quickly requests arrive. Threads start on first use, so a
+    stage sized for bursts (like devices) costs nothing while idle.
+    """
+
+    def __init__(self, stages=None):
+        settings = {name: dict(limits) for name, limits in DEFAULT_EXECUTOR_CONFIG.items()}
+        for name, limits in (stages or {}).items():
+            settings.setdefault(name, {}).update(limits)
+        self.stages = {name: Stage(name, limits["workers"], limits["queue"])
+                       for name, limits in settings.items()}
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.get("executor"))
+
+    def submit(self, stage, fn, *args, **kwargs):
+        return self.stages[stage].submit(fn, *args, **kwargs)
+
+    def stats(self):
+        """Queue depth and throughput counters per stage"""
+        return {name: stage.stats() for name, stage in self.stages.items()}
@@ -0,0 +1,333 @@
+import json
+import re
+import socket
+import struct
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+DEFAULT_FAKE_CONFIG = {
+    "token_rate": 40,  # Ollama tokens per second
+    "first_token_delay": 0.15,
+    "tts_first_byte_delay": 0.2,
+    "tts_bytes_per_char": 1100,  # Roughly mp3_44100_128 at a normal speaking rate
+    "api_delay": 0.05
+}
+
+CONVERSATION_REPLY = ("Sure thing! I'm always happy to help. Let me know if there is anything else "
+                      "you would like to talk about today.")
+
+LABEL_CHATTER = " - this request is about that category because of the words it uses."
+
+
+def requested_text(prompt):
+    """The user's request is the last quoted string in every prompt the assistant builds"""
+    quoted = re.findall(r'"([^"]*)"', prompt)
+    return (quoted[-1] if quoted else prompt).lower()
+
+
+def fake_understanding(text):
+    """What a well-behaved model would extract from a request"""
+    result = {"intent": "CONVERSATION", "sub_type": None, "location": None, "symbol": None,
+              "device": None, "state": None}
+    if "light" in text:
+        result.update(intent="HOME_AUTOMATION", device="LIGHTS", state="OFF" if "off" in text else "ON")
+    elif "weather" in text or "temperature" in text or "rain" in text:
+        match = re.search(r"\bin ([a-z ]+)", text)
+        result.update(intent="EXTERNAL_API", sub_type="WEATHER", location=match.group(1).strip() if match else None)
+    elif "stock" in text or "share" in text or "trading" in text:
+        match = re.search(r"\b([a-z]{1,5})\s+(?:stock|shares?)\b", text)
+        result.update(intent="EXTERNAL_API", sub_type="STOCKS", symbol=match.group(1).upper() if match else None)
+    return result
+
+
+def fake_generation(data):
+    """Return the tokens Ollama would stream for one /api/generate request"""
+    prompt = data.get("prompt", "")
+    understanding = fake_understanding(requested_text(prompt))
+    if data.get("format") == "json":
+        text = json.dumps(understanding)
+        return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+    label = None
+    if "'TARGET:ON' or 'TARGET:OFF'" in prompt:
+        label = f"{understanding['device'] or 'LIGHTS'}:{understanding['state'] or 'ON'}"
+    elif "'WEATHER', 'STOCKS', or 'OTHER'" in prompt:
+        label = understanding["sub_type"] or "OTHER"
+    if label is not None:
+        if isinstance(data.get("format"), dict):
+            label = json.dumps(label)  # A schema-constrained answer is exactly one JSON string
+        else:
+            label += LABEL_CHATTER  # An unconstrained model rarely stops at the label
+        tokens = [label[i:i + 3] for i in range(0, len(label), 3)]
+        return tokens[:data.get("options", {}).get("num_predict") or len(tokens)]
+    if "Location:" in prompt:
+        return [understanding["location"] or "DEFAULT"]
+    if "Stock:" in prompt:
+        return [understanding["symbol"] or "DEFAULT"]
+    return re.findall(r"\S+\s*", CONVERSATION_REPLY)
+
+
+def fake_quote(symbol):
+    """A stable made-up quote, so repeated runs speak the same numbers"""
+    seed = sum(ord(char) * (index + 1) for index, char in enumerate(symbol))
+    close = 50 + seed % 450 + (seed % 100) / 100
+    change = (seed % 700) / 100 - 3
+    return {"symbol": symbol, "close": close, "change": change,
+            "change_percent": change / (close - change) * 100, "volume": 1000000 + seed * 1000}
+
+
+class FakeServer(ThreadingHTTPServer):
+    # Group commands open many connections at once; the default backlog of 5 would reset them
+    request_queue_size = 128
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients close streams early on purpose, e.g. once a classification label is complete
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+class FakeServices:
+    """
+    One local HTTP server standing in for Ollama (/api/generate), ElevenLabs (/v1/text-to-speech),
+    OpenWeatherMap (/data/2.5/weather), Alpha Vantage (/query), IFTTT webhooks (/trigger) and
+    LAN devices (/devices/<id>), with configurable latencies.
+    """
+
+    def __init__(self, settings=None, port=0):
+        self.settings = dict(DEFAULT_FAKE_CONFIG)
+        self.settings.update(settings or {})
+        self.requests = {}  # service -> request count
+        self.device_states = {}  # device id -> last state it was switched to
+        self._lock = threading.Lock()
+
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                services.handle(self)
+
+            def do_POST(self):
+                services.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = FakeServer(("127.0.0.1", port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-services", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, service):
+        with self._lock:
+            self.requests[service] = self.requests.get(service, 0) + 1
+
+    def handle(self, request):
+        path = urlparse(request.path)
+        length = int(request.headers.get("Content-Length") or 0)
+        body = request.rfile.read(length) if length else b""
+        try:
+            if path.path == "/api/generate":
+                self.count("ollama")
+                self.generate(request, json.loads(body))
+            elif path.path.startswith("/v1/text-to-speech/"):
+                self.count("elevenlabs")
+                self.text_to_speech(request, json.loads(body))
+            elif path.path == "/data/2.5/weather":
+                self.count("weather")
+                self.weather(request, parse_qs(path.query))
+            elif path.path == "/query":
+                self.count("stocks")
+                self.quotes(request, parse_qs(path.query))
+            elif path.path.startswith("/trigger/"):
+                self.count("ifttt")
+                time.sleep(self.settings["api_delay"])
+                self.send_json(request, "Congratulations! You've fired the event")
+            elif path.path.startswith("/devices/"):
+                self.count("devices")
+                self.device(request, path.path.split("/")[2], parse_qs(path.query), body)
+            else:
+                request.send_error(404)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client cancelled the request
+
+    def quotes(self, request, query):
+        """GLOBAL_QUOTE for one symbol or REALTIME_BULK_QUOTES for a comma-separated list"""
+        time.sleep(self.settings["api_delay"])
+        function = query.get("function", [""])[0]
+        symbols = [symbol for symbol in query.get("symbol", [""])[0].upper().split(",") if symbol]
+        quotes = [fake_quote(symbol) for symbol in symbols]
+        if function == "GLOBAL_QUOTE" and len(quotes) == 1:
+            quote = quotes[0]
+            self.send_json(request, {"Global Quote": {
+                "01. symbol": quote["symbol"], "05. price": f"{quote['close']:.4f}",
+                "06. volume": str(quote["volume"]), "09. change": f"{quote['change']:.4f}",
+                "10. change percent": f"{quote['change_percent']:.4f}%"}})
+        elif function == "REALTIME_BULK_QUOTES":
+            self.send_json(request, {"endpoint": "Realtime Bulk Quotes", "data": quotes})
+        else:
+            self.send_json(request, {"Error Message": "Invalid API call."})
+
+    def device(self, request, device_id, query, body):
+        """A relay that takes ?turn=on|off like a Shelly, or a JSON {"state": ...} body"""
+        time.sleep(self.settings["api_delay"])
+        state = query.get("turn", [None])[0] or (json.loads(body).get("state") if body else None)
+        if state not in ("on", "off"):
+            self.send_json(request, {"error": "state must be on or off"}, 400)
+            return
+        with self._lock:
+            self.device_states[device_id] = state
+        self.send_json(request, {"ison": state == "on"})
+
+    def send_json(self, request, payload, status=200):
+        data = json.dumps(payload).encode()
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+
+    def send_chunk(self, request, data):
+        request.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        request.wfile.flush()
+
+    def start_chunked(self, request, content_type):
+        request.send_response(200)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Transfer-Encoding", "chunked")
+        request.end_headers()
+
+    def generate(self, request, data):
+        tokens = fake_generation(data)
+        self.start_chunked(request, "application/x-ndjson")
+        time.sleep(self.settings["first_token_delay"])
+        started = time.perf_counter()
+        for index, token in enumerate(tokens):
+            # Tokens are paced against the start so the configured rate holds on slow machines
+            delay = started + index / self.settings["token_rate"] - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.send_chunk(request, (json.dumps({"response": token, "done": False}) + "\n").encode())
+        final = {"response": "", "done": True, "prompt_eval_count": len(data.get("prompt", "")) // 4,
+                 "eval_count": len(tokens), "context": [1, 2, 3]}
+        self.send_chunk(request, (json.dumps(final) + "\n").encode())
+        request.wfile.write(b"0\r\n\r\n")
+
+    def text_to_speech(self, request, data):
+        size = len(data.get("text", "")) * self.settings["tts_bytes_per_char"]
+        self.start_chunked(request, "audio/mpeg")
+        time.sleep(self.settings["tts_first_byte_delay"])
+        for start in range(0, size, 4096):
+            self.send_chunk(request, b"\xff" * min(4096, size - start))
+        request.wfile.write(b"0\r\n\r\n")
+
+    def weather(self, request, query):
+        time.sleep(self.settings["api_delay"])
+        location = query.get("q", ["Manassas"])[0]
+        self.send_json(request, {
+            "main": {"temp": 72.5},
+            "weather": [{"description": "clear sky"}],
+            "name": location.split(",")[0].title(),
+            "sys": {"country": "US"}
+        })
+
+
+class FakeMqttBroker:
+    """
+    Just enough of an MQTT 3.1.1 broker to accept QoS 1 publishes. Each PUBACK is sent after
+    api_delay on its own timer, so pipelined publishes are acknowledged concurrently.
+    Clearing acknowledge makes it behave like a half-open connection: publishes vanish unanswered.
+    """
+
+    def __init__(self, api_delay=DEFAULT_FAKE_CONFIG["api_delay"], port=0):
+        self.api_delay = api_delay
+        self.acknowledge = True
+        self.connections = 0
+        self.messages = []  # (topic, payload) in arrival order
+        self._lock = threading.Lock()
+        self.server = socket.create_server(("127.0.0.1", port))
+        self.port = self.server.getsockname()[1]
+        self._thread = threading.Thread(target=self._accept, name="fake-mqtt", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.close()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            with self._lock:
+                self.connections += 1
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    @staticmethod
+    def _read_exact(conn, size):
+        data = b""
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError()
+            data += chunk
+        return data
+
+    def _serve(self, conn):
+        write_lock = threading.Lock()
+
+        def send(data):
+            with write_lock:
+                try:
+                    conn.sendall(data)
+                except OSError:
+                    pass
+
+        try:
+            while True:
+                header = self._read_exact(conn, 1)[0]
+                length, multiplier = 0, 1
+                while True:
+                    byte = self._read_exact(conn, 1)[0]
+                    length += (byte & 0x7F) * multiplier
+                    multiplier *= 128
+                    if not byte & 0x80:
+                        break
+                body = self._read_exact(conn, length)
+                kind = header >> 4
+                if kind == 1:  # CONNECT
+                    send(b"\x20\x02\x00\x00")
+                elif kind == 3:  # PUBLISH
+                    if not self.acknowledge:
+                        continue
+                    topic_length = struct.unpack("!H", body[:2])[0]
+                    topic = body[2:2 + topic_length].decode()
+                    rest = body[2 + topic_length:]
+                    if header & 0x06:
+                        packet_id, rest = rest[:2], rest[2:]
+                        threading.Timer(self.api_delay, send, args=(b"\x40\x02" + packet_id,)).start()
+                    with self._lock:
+                        self.messages.append((topic, rest.decode()))
+                elif kind == 12:  # PINGREQ
+                    send(b"\xd0\x00")
+                elif kind == 14:  # DISCONNECT
+                    break
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            conn.close()
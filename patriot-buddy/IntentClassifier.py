@@ -0,0 +1,205 @@
+import argparse
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+
+DEFAULT_CLASSIFIER_CONFIG = {
+    "enabled": True,
+    "model_path": "patriot-buddy/intent_model.json",
+    "log_path": "patriot-buddy/intent_log.jsonl",
+    "threshold": 0.9
+}
+
+WORD = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text):
+    """Lower-cased word unigrams plus bigrams"""
+    words = WORD.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def load_examples(*paths):
+    """Read (text, label) pairs from JSONL files with "text" and "label" fields"""
+    examples = []
+    for path in paths:
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    record = json.loads(line)
+                    examples.append((record["text"], record["label"]))
+    return examples
+
+
+class IntentClassifier:
+    """Multinomial naive Bayes over word n-grams, small enough to answer in microseconds"""
+
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+        self.doc_counts = {}
+        self.token_counts = {}
+        self._compile()
+
+    def train(self, examples):
+        """Fit the model on (text, label) pairs, replacing anything learned before"""
+        self.doc_counts = {}
+        self.token_counts = {}
+        for text, label in examples:
+            self.doc_counts[label] = self.doc_counts.get(label, 0) + 1
+            counts = self.token_counts.setdefault(label, {})
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+        self._compile()
+        return self
+
+    def _compile(self):
+        """Precompute log probabilities so prediction is just dictionary lookups"""
+        vocabulary = set()
+        for counts in self.token_counts.values():
+            vocabulary.update(counts)
+        total_docs = sum(self.doc_counts.values())
+
+        self.log_prior = {}
+        self.log_likelihood = {}
+        self.log_unseen = {}
+        for label, docs in self.doc_counts.items():
+            counts = self.token_counts.get(label, {})
+            denominator = sum(counts.values()) + self.alpha * (len(vocabulary) + 1)
+            self.log_prior[label] = math.log(docs / total_docs)
+            self.log_likelihood[label] = {token: math.log((count + self.alpha) / denominator)
+                                          for token, count in counts.items()}
+            self.log_unseen[label] = math.log(self.alpha / denominator)
+
+    def predict_proba(self, text):
+        """Return {label: probability} for a transcript"""
+        if not self.log_prior:
+            return {}
+        tokens = tokenize(text)
+        scores = {}
+        for label, prior in self.log_prior.items():
+            likelihood = self.log_likelihood[label]
+            unseen = self.log_unseen[label]
+            scores[label] = prior + sum(likelihood.get(token, unseen) for token in tokens)
+
+        best = max(scores.values())
+        exp_scores = {label: math.exp(score - best) for label, score in scores.items()}
+        total = sum(exp_scores.values())
+        return {label: value / total for label, value in exp_scores.items()}
+
+    def predict(self, text):
+        """Return the most likely (label, confidence), or (None, 0.0) for an untrained model"""
+        probabilities = self.predict_proba(text)
+        if not probabilities:
+            return None, 0.0
+        label = max(probabilities, key=probabilities.get)
+        return label, probabilities[label]
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({"alpha": self.alpha, "doc_counts": self.doc_counts,
+                       "token_counts": self.token_counts}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        classifier = cls(alpha=data.get("alpha", 1.0))
+        classifier.doc_counts = data["doc_counts"]
+        classifier.token_counts = data["token_counts"]
+        classifier._compile()
+        return classifier
+
+
+class ExampleLog:
+    """Appends LLM-labelled transcripts so the classifier can be retrained from real usage"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, text, label):
+        try:
+            with self._lock, open(self.path, 'a') as f:
+                f.write(json.dumps({"text": text, "label": label}) + "\n")
+        except Exception as e:
+            print(f"Error logging intent example: {e}")
+
+
+def evaluate(classifier, examples, threshold):
+    """Accuracy overall and on the confident subset, plus how much traffic skips the LLM"""
+    correct = 0
+    confident = 0
+    confident_correct = 0
+    confusion = {}
+    start = time.perf_counter()
+    for text, label in examples:
+        predicted, confidence = classifier.predict(text)
+        confusion.setdefault(label, {}).setdefault(predicted, 0)
+        confusion[label][predicted] += 1
+        correct += predicted == label
+        if confidence >= threshold:
+            confident += 1
+            confident_correct += predicted == label
+    elapsed = time.perf_counter() - start
+
+    total = len(examples) or 1
+    return {
+        "examples": len(examples),
+        "accuracy": correct / total,
+        "threshold": threshold,
+        "coverage": confident / total,
+        "confident_accuracy": confident_correct / confident if confident else None,
+        "microseconds_per_prediction": elapsed / total * 1e6,
+        "confusion": confusion
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and evaluate the local intent classifier")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="train a model from JSONL (text, label) files")
+    train_parser.add_argument("data", nargs="+")
+    train_parser.add_argument("--model", default=DEFAULT_CLASSIFIER_CONFIG["model_path"])
+    train_parser.add_argument("--holdout", type=float, default=0.0,
+                              help="fraction of examples held out and reported on")
+    train_parser.add_argument("--threshold", type=float, default=DEFAULT_CLASSIFIER_CONFIG["threshold"])
+
+    eval_parser = subparsers.add_parser("eval", help="evaluate a saved model on JSONL files")
+    eval_parser.add_argument("data", nargs="+")
+    eval_parser.add_argument("--model", default=DEFAULT_CLASSIFIER_CONFIG["model_path"])
+    eval_parser.add_argument("--threshold", type=float, default=DEFAULT_CLASSIFIER_CONFIG["threshold"])
+
+    predict_parser = subparsers.add_parser("predict", help="classify a single transcript")
+    predict_parser.add_argument("text")
+    predict_parser.add_argument("--model", default=DEFAULT_CLASSIFIER_CONFIG["model_path"])
+
+    args = parser.parse_args()
+
+    if args.command == "train":
+        examples = load_examples(*[path for path in args.data if os.path.exists(path)])
+        held_out = []
+        if args.holdout > 0:
+            random.Random(0).shuffle(examples)
+            split = int(len(examples) * args.holdout)
+            held_out, examples = examples[:split], examples[split:]
+        classifier = IntentClassifier().train(examples)
+        classifier.save(args.model)
+        print(f"Trained on {len(examples)} examples, saved to {args.model}")
+        if held_out:
+            print(json.dumps(evaluate(classifier, held_out, args.threshold), indent=2))
+    elif args.command == "eval":
+        classifier = IntentClassifier.load(args.model)
+        print(json.dumps(evaluate(classifier, load_examples(*args.data), args.threshold), indent=2))
+    else:
+        label, confidence = IntentClassifier.load(args.model).predict(args.text)
+        print(f"{label} ({confidence:.3f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,181 @@
+import queue
 import threading
+import time
+from AudioCapture import AudioCapture, Endpointer, DEFAULT_CAPTURE_CONFIG
+from Executor import StageBusy
+from SpeechToText import create_backend
+from WakeWord import WakeWordDetector, DEFAULT_WAKE_WORD_CONFIG
+from Callbacks import Callbacks
 import speech_recognition as sr
-from PySide6.QtCore import Signal, QObject
 
-class Listener(QObject):
-    text_received = Signal(str, str)
+class Listener:
+    """
+    Turns microphone audio into transcripts. Messages are emitted as (message, type) through
+    text_received on the capture and listen threads; front ends forward them to their own thread.
+    """
 
-    def __init__(self):
-        super(Listener, self).__init__()
+    def __init__(self, executor=None, settings=None, wake_word_settings=None, stt_settings=None):
+        self.text_received = Callbacks()
+        self.executor = executor
         self.is_listening = False
-        self.record = sr.Recognizer()
+        self.hands_free = False
+        self.wake_word = None
+        self.utterance = None  # Frame queue feeding the transcription of the current utterance
+        # perf_counter readings for the utterance being captured and the last one transcribed
+        self.timings = {}
+        self.last_timings = {}
+
+        self.settings = dict(DEFAULT_CAPTURE_CONFIG)
+        self.settings.update(settings or {})
+
+        # The microphone stays open; each click only arms the endpointer
+        self.capture = AudioCapture(self.settings["sample_rate"], self.settings["chunk"],
+                                    self.settings["buffer_seconds"])
+        self.endpointer = Endpointer(self.capture.frame_duration,
+                                     pre_roll=self.settings["pre_roll"],
+                                     end_silence=self.settings["end_silence"],
+                                     start_timeout=self.settings["start_timeout"],
+                                     max_utterance=self.settings["max_utterance"],
+                                     speech_ratio=self.settings["speech_ratio"],
+                                     min_energy=self.settings["min_energy"],
+                                     noise_adapt=self.settings["noise_adapt"])
+        self.stt = create_backend(stt_settings, self.capture.sample_rate)
+        self.capture.subscribe(self.on_frame)
+        self.capture.failed.connect(self.on_capture_failed)
+        if self.settings["microphone"]:
+            self.capture.start()
+
+        self.wake_word_settings = dict(DEFAULT_WAKE_WORD_CONFIG)
+        self.wake_word_settings.update(wake_word_settings or {})
+        if self.wake_word_settings["enabled"]:
+            self.set_hands_free(True)
+
+    def set_hands_free(self, enabled):
+        """Turn wake word listening on or off. Returns False if the detector is unavailable."""
+        if enabled and self.wake_word is None:
+            try:
+                self.wake_word = WakeWordDetector(self.capture.frame_duration, self.capture.sample_rate,
+                                                  self.capture.sample_width,
+                                                  phrase=self.wake_word_settings["phrase"],
+                                                  sensitivity=self.wake_word_settings["sensitivity"],
+                                                  cpu_budget=self.wake_word_settings["cpu_budget"],
+                                                  gate_ratio=self.wake_word_settings["gate_ratio"],
+                                                  min_energy=self.wake_word_settings["min_energy"],
+                                                  hangover=self.wake_word_settings["hangover"])
+            except Exception as e:
+                print(f"Error starting wake word detection: {e}")
+                return False
+        self.hands_free = enabled
+        return True
 
     def toggle_listening(self):
         if not self.is_listening:
-            self.start_listening()
+            if not self.start_listening():
+                return "NotListening"
             return "Listening"
         else:
             self.stop_listening()
             return "NotListening"
 
     def start_listening(self):
+        """Arm the endpointer for the next utterance. Returns False if the microphone has failed."""
         self.is_listening = True
+        self.timings = {"armed": time.perf_counter()}
+        self.endpointer.sample_width = self.capture.sample_width
+        self.endpointer.arm()
+        if self.capture.error is not None:
+            # No frames will arrive to end listening with a timeout
+            self.stop_listening()
+            self.text_received.emit(f"Microphone unavailable: {self.capture.error}", "error")
+            return False
+        return True
 
-        def listen():
-            with sr.Microphone() as source:
-                self.record.adjust_for_ambient_noise(source)
-                try:
-                    audio = self.record.listen(source, timeout=5)
-                    try:
-                        text = self.record.recognize_google(audio)
-                        self.text_received.emit(text, "user_input")
-                    except sr.UnknownValueError:
-                        self.text_received.emit("I couldn't understand that. Please try again.", "error")
-                    except sr.RequestError as e:
-                        self.text_received.emit(f"Speech recognition request error: {e}", "error")
-                except sr.WaitTimeoutError:
-                    self.text_received.emit("No speech detected", "error")            
+    def on_capture_failed(self, error):
+        """Runs on the capture thread when the stream cannot be opened or stops"""
+        self.text_received.emit(f"Microphone unavailable: {error}", "error")
+        if self.is_listening:
+            self.stop_listening()
+            self.text_received.emit("", "stop_listening")
 
-        threading.Thread(target=listen, daemon=True).start()
+    def on_frame(self, seq, frame):
+        """Runs on the capture thread for every frame"""
+        event = self.endpointer.process(seq, frame)
+        if self.hands_free and not self.is_listening:
+            if self.wake_word.process(frame, self.endpointer.noise_floor):
+                # Same path as a click: arm the endpointer for the command that follows
+                self.text_received.emit("", "wake")
+                self.start_listening()
+            return
+        if event == "timeout":
+            self.is_listening = False
+            self.text_received.emit("No speech detected", "error")
+            self.text_received.emit("", "stop_listening")
+        elif event == "speech":
+            # Transcription starts with the pre-roll and keeps pace with the speaker
+            self.timings["speech"] = time.perf_counter()
+            self.timings["noise_floor"] = self.endpointer.noise_floor
+            self.utterance = self.submit_recognition(self.timings)
+            if self.utterance is not None:
+                for buffered in self.capture.frames_between(self.endpointer.start_seq, seq + 1):
+                    self.utterance.put(buffered)
+        elif isinstance(event, tuple):
+            _, start_seq, end_seq = event
+            self.is_listening = False
+            self.timings["endpoint"] = time.perf_counter()
+            # Hand over the audio before announcing the stop, which would abort an unfinished utterance
+            if self.utterance is not None:
+                self.utterance.put(self.capture.cut(start_seq, end_seq))
+                self.utterance = None
+            self.text_received.emit("", "stop_listening")
+        elif self.utterance is not None:
+            self.utterance.put(frame)
 
+    def submit_recognition(self, timings):
+        """Start transcribing a new utterance; returns the queue its frames are fed through"""
+        frames = queue.Queue()
+        if self.executor is None:
+            threading.Thread(target=self.recognize, args=(frames, timings), daemon=True).start()
+            return frames
+        try:
+            self.executor.submit("listen", self.recognize, frames, timings)
+        except StageBusy:
+            self.text_received.emit("Still working on the last request", "error")
+            return None
+        return frames
 
+    def recognize(self, frames, timings=None):
+        """
+        Feed frames to the backend as they arrive. The utterance ends with its AudioData,
+        or with None if listening was stopped before the speaker finished.
+        """
+        timings = timings if timings is not None else {}
+        self.stt.start()
+        partial = None
+        while True:
+            item = frames.get()
+            if item is None:
+                return
+            if isinstance(item, sr.AudioData):
+                break
+            if self.stt.streaming:
+                text = self.stt.accept(item)
+                if text and text != partial:
+                    partial = text
+                    timings.setdefault("first_partial", time.perf_counter())
+                    self.text_received.emit(text, "partial_input")
+        try:
+            text = self.stt.finish(item)
+            timings["transcribed"] = time.perf_counter()
+            self.last_timings = timings
+            self.text_received.emit(text, "user_input")
+        except sr.UnknownValueError:
+            self.text_received.emit("I couldn't understand that. Please try again.", "error")
+        except sr.RequestError as e:
+            self.text_received.emit(f"Speech recognition request error: {e}", "error")
 
     def stop_listening(self):
-        self.is_listening = False              
+        self.is_listening = False
+        self.endpointer.disarm()
+        if self.utterance is not None:
+            self.utterance.put(None)
+            self.utterance = None
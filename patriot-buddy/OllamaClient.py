@@ -0,0 +1,204 @@
+import json
+import threading
+import time
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from OllamaScheduler import OllamaScheduler
+
+DEFAULT_OLLAMA_CONFIG = {
+    "url": "http://localhost:11434",
+    "model": "mistral",
+    "connect_timeout": 3.05,
+    "read_timeout": 120,
+    "pool_size": 4,
+    "max_in_flight": 2,
+    "chat_slots": 1
+}
+
+
+class OllamaClient:
+    """Keep-alive client for the local Ollama server shared by every handler"""
+
+    def __init__(self, url=DEFAULT_OLLAMA_CONFIG["url"], model=DEFAULT_OLLAMA_CONFIG["model"],
+                 connect_timeout=DEFAULT_OLLAMA_CONFIG["connect_timeout"],
+                 read_timeout=DEFAULT_OLLAMA_CONFIG["read_timeout"],
+                 pool_size=DEFAULT_OLLAMA_CONFIG["pool_size"],
+                 max_in_flight=DEFAULT_OLLAMA_CONFIG["max_in_flight"],
+                 chat_slots=DEFAULT_OLLAMA_CONFIG["chat_slots"]):
+        self.url = url.rstrip("/")
+        self.model = model
+        self.timeout = (connect_timeout, read_timeout)
+        self.scheduler = OllamaScheduler(max_in_flight, chat_slots)
+        self.constrained_format = True  # Cleared if the server rejects JSON schema formats
+
+        # One pooled session so every generation reuses an open connection
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Per-call stats: the most recent call on each thread plus a short history
+        self.history = deque(maxlen=100)
+        self.stats_callbacks = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a client from the "ollama" section of the app config"""
+        settings = dict(DEFAULT_OLLAMA_CONFIG)
+        settings.update(config.get("ollama", {}))
+        return cls(**settings)
+
+    @property
+    def last_stats(self):
+        """Stats for the most recent call made from the current thread"""
+        return getattr(self._local, "stats", None)
+
+    def stream(self, prompt, model=None, ctx=None, priority="data", **fields):
+        """
+        Yield response tokens as Ollama generates them.
+        priority is "control", "data", "chat" or "speculative" and decides the order in which queued generations start.
+        Extra keyword arguments (format, options, system, context, ...) are sent as request fields.
+        If the RequestContext ctx is cancelled the HTTP stream is closed and iteration stops.
+        """
+        data = {"model": model or self.model, "prompt": prompt, "stream": True}
+        data.update(fields)
+
+        queued = time.perf_counter()
+        waited = self.scheduler.acquire(priority, getattr(ctx, "session", "local"), ctx)
+        trace = getattr(ctx, "trace", None)
+        if trace is not None:
+            trace.add("ollama_queue", queued, time.perf_counter(), priority=priority, admitted=waited is not None)
+        if waited is None:
+            return  # Cancelled while queued
+
+        start = time.perf_counter()
+        first_token = None
+        tokens = 0
+        final = {}
+        unregister = None
+        try:
+            if ctx is not None and ctx.cancelled:
+                return
+            with self.session.post(f"{self.url}/api/generate", json=data, stream=True,
+                                   timeout=self.timeout) as response:
+                response.raise_for_status()
+                if ctx is not None:
+                    # Closing the response unblocks iter_lines and tells Ollama to stop generating
+                    unregister = ctx.on_cancel(response.close)
+                for line in self._lines(response, ctx):
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    token = chunk.get("response")
+                    if token:
+                        if first_token is None:
+                            first_token = time.perf_counter()
+                        tokens += 1
+                        yield token
+                    if chunk.get("done"):
+                        final = chunk
+                        break
+        finally:
+            if unregister is not None:
+                unregister()
+            self.scheduler.release(priority)
+            self._record(data["model"], start, first_token, tokens, final, ctx)
+
+    def generate(self, prompt, model=None, ctx=None, priority="data", **fields):
+        """Return the full response text for a prompt"""
+        return "".join(self.stream(prompt, model=model, ctx=ctx, priority=priority, **fields))
+
+    def classify(self, prompt, labels, model=None, ctx=None, priority="control"):
+        """
+        Closed-set generation: return whichever of labels the model answers with, or None.
+        Sampling is greedy and capped at a few tokens, the output is constrained to the labels
+        where the server supports JSON schemas, and the stream is closed as soon as it spells one.
+        """
+        labels = [label.upper() for label in labels]
+        fields = {"options": {"temperature": 0, "num_predict": max(len(label) for label in labels) // 2 + 4,
+                              "stop": ["\n"]}}
+        if self.constrained_format:
+            fields["format"] = {"type": "string", "enum": labels}
+
+        text = ""
+        tokens = self.stream(prompt, model=model, ctx=ctx, priority=priority, **fields)
+        try:
+            for token in tokens:
+                text += token
+                if self._match(text, labels, exact=True):
+                    break  # Closing the generator below closes the HTTP stream
+        except requests.HTTPError as e:
+            if "format" not in fields or e.response is None or e.response.status_code != 400:
+                raise
+            # An Ollama too old for structured outputs; ask again without the schema
+            self.constrained_format = False
+            return self.classify(prompt, labels, model=model, ctx=ctx, priority=priority)
+        finally:
+            tokens.close()
+        return self._match(text, labels)
+
+    @staticmethod
+    def _match(text, labels, exact=False):
+        """The label text spells; without exact, the longest label mentioned anywhere in it"""
+        answer = text.strip().strip("\"'.`* ").upper()
+        if exact:
+            # Keep reading while the answer could still grow into a longer label
+            if any(label != answer and label.startswith(answer) for label in labels):
+                return None
+            for label in sorted(labels, key=len, reverse=True):
+                rest = answer[len(label):]
+                if answer.startswith(label) and not (rest[:1].isalnum() or rest[:1] in ("_", ":")):
+                    return label
+            return None
+        if answer in labels:
+            return answer
+        for label in sorted(labels, key=len, reverse=True):
+            if label in answer:
+                return label
+        return None
+
+    @staticmethod
+    def _lines(response, ctx):
+        """iter_lines that ends quietly when the response was closed by a cancellation"""
+        try:
+            for line in response.iter_lines():
+                if ctx is not None and ctx.cancelled:
+                    return
+                yield line
+        except Exception:
+            if ctx is not None and ctx.cancelled:
+                return
+            raise
+
+    def _record(self, model, start, first_token, tokens, final, ctx=None):
+        end = time.perf_counter()
+        latency = end - start
+        generation = end - first_token if first_token else 0.0
+        stats = {
+            "model": model,
+            "tokens": tokens,
+            "latency": latency,
+            "time_to_first_token": first_token - start if first_token else None,
+            "tokens_per_second": tokens / generation if generation > 0 else None,
+            "completed": bool(final.get("done")),
+            "prompt_eval_count": final.get("prompt_eval_count"),
+            "eval_count": final.get("eval_count"),
+            "context": final.get("context"),
+        }
+        self._local.stats = stats
+        trace = getattr(ctx, "trace", None)
+        if trace is not None:
+            trace.add("ollama", start, end, **{key: stats[key] for key in
+                                               ("model", "tokens", "time_to_first_token",
+                                                "tokens_per_second", "completed")})
+        with self._lock:
+            self.history.append({key: value for key, value in stats.items() if key != "context"})
+            callbacks = list(self.stats_callbacks)
+        for callback in callbacks:
+            try:
+                callback(stats)
+            except Exception as e:
+                print(f"Error in Ollama stats callback: {e}")
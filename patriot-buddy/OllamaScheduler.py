@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Highest priority first: device control must not wait behind data lookups or chat.
+# Speculative work runs before the request is classified, so it must never delay that classification.
+PRIORITIES = ("control", "data", "chat", "speculative")
+
+
+class _Ticket:
+    def __init__(self, priority, session):
+        self.priority = priority
+        self.session = session
+        self.queued_at = time.perf_counter()
+        self.granted = False
+
+
+class OllamaScheduler:
+    """
+    Admission control in front of Ollama. At most max_in_flight generations run at once and
+    chat and speculative generations together may only use chat_slots of them, so a control request
+    always finds a free slot soon, including the classification that speculative work overlaps.
+    Waiting requests are served by priority, and round-robin between sessions within a priority.
+    """
+
+    def __init__(self, max_in_flight=2, chat_slots=1):
+        self.max_in_flight = max(1, max_in_flight)
+        self.chat_slots = max(1, min(chat_slots, self.max_in_flight))
+        self.queues = {priority: OrderedDict() for priority in PRIORITIES}  # session -> deque of tickets
+        self.in_flight = {priority: 0 for priority in PRIORITIES}
+        self.waits = {priority: deque(maxlen=200) for priority in PRIORITIES}
+        self.served = {priority: 0 for priority in PRIORITIES}
+        self.abandoned = {priority: 0 for priority in PRIORITIES}
+        self._cond = threading.Condition()
+
+    def acquire(self, priority="data", session="local", ctx=None):
+        """
+        Block until a generation may start. Returns the seconds spent queued,
+        or None if ctx was cancelled first (the slot is then not held).
+        """
+        if priority not in self.queues:
+            priority = "data"
+        ticket = _Ticket(priority, session)
+        unregister = ctx.on_cancel(self._wake) if ctx is not None else None
+        try:
+            with self._cond:
+                self.queues[priority].setdefault(session, deque()).append(ticket)
+                self._grant()
+                while not ticket.granted:
+                    if ctx is not None and ctx.cancelled:
+                        self._withdraw(ticket)
+                        self.abandoned[priority] += 1
+                        return None
+                    self._cond.wait()
+                waited = time.perf_counter() - ticket.queued_at
+                self.waits[priority].append(waited)
+                self.served[priority] += 1
+                return waited
+        finally:
+            if unregister is not None:
+                unregister()
+
+    def release(self, priority="data"):
+        if priority not in self.queues:
+            priority = "data"
+        with self._cond:
+            self.in_flight[priority] -= 1
+            self._grant()
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def _withdraw(self, ticket):
+        sessions = self.queues[ticket.priority]
+        tickets = sessions.get(ticket.session)
+        if tickets is not None and ticket in tickets:
+            tickets.remove(ticket)
+            if not tickets:
+                del sessions[ticket.session]
+
+    def _grant(self):
+        """Hand free slots to waiting tickets; called with the lock held"""
+        granted = False
+        while sum(self.in_flight.values()) < self.max_in_flight:
+            for priority in PRIORITIES:
+                sessions = self.queues[priority]
+                if not sessions:
+                    continue
+                if (priority in ("chat", "speculative")
+                        and self.in_flight["chat"] + self.in_flight["speculative"] >= self.chat_slots):
+                    continue
+                # The session at the front gets one slot, then goes to the back of the line
+                session, tickets = next(iter(sessions.items()))
+                ticket = tickets.popleft()
+                del sessions[session]
+                if tickets:
+                    sessions[session] = tickets
+                ticket.granted = True
+                self.in_flight[priority] += 1
+                granted = True
+                break
+            else:
+                break
+        if granted:
+            self._cond.notify_all()
+
+    def stats(self):
+        """Queue depth, in-flight count and queue-wait percentiles per priority"""
+        with self._cond:
+            result = {}
+            for priority in PRIORITIES:
+                waits = sorted(self.waits[priority])
+                result[priority] = {
+                    "queued": sum(len(tickets) for tickets in self.queues[priority].values()),
+                    "in_flight": self.in_flight[priority],
+                    "served": self.served[priority],
+                    "abandoned": self.abandoned[priority],
+                    "wait_p50": waits[len(waits) // 2] if waits else None,
+                    "wait_p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else None,
+                    "wait_max": waits[-1] if waits else None
+                }
+            return result
@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+DEFAULT_PREFETCH_CONFIG = {
+    "enabled": True,
+    "tick": 30,
+    "interval": 540,
+    "idle_interval": 3600,
+    "lead_minutes": 15,
+    "min_usage": 3,
+    "profile_path": "patriot-buddy/usage_profile.json"
+}
+
+BUCKET_MINUTES = 15
+BUCKETS_PER_DAY = 24 * 60 // BUCKET_MINUTES
+
+
+class UsageProfile:
+    """Counts of queries per API by quarter-hour of the day, used to anticipate the next query"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.counts = {}  # api_id -> [count per bucket]
+        self.dirty = False
+        self._lock = threading.Lock()
+        if path:
+            self.load()
+
+    @staticmethod
+    def bucket(moment):
+        return (moment.hour * 60 + moment.minute) // BUCKET_MINUTES
+
+    def record(self, api_id, moment=None):
+        bucket = self.bucket(moment or datetime.now())
+        with self._lock:
+            self.counts.setdefault(api_id, [0] * BUCKETS_PER_DAY)[bucket] += 1
+            self.dirty = True
+
+    def expected_soon(self, api_id, lead_minutes, min_usage, moment=None):
+        """True if this API is usually queried between now and lead_minutes from now"""
+        start = self.bucket(moment or datetime.now())
+        span = lead_minutes // BUCKET_MINUTES + 1
+        with self._lock:
+            counts = self.counts.get(api_id)
+            if counts is None:
+                return False
+            return any(counts[(start + offset) % BUCKETS_PER_DAY] >= min_usage for offset in range(span))
+
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    self.counts = json.load(f)
+        except Exception as e:
+            print(f"Error loading usage profile: {e}")
+
+    def save(self):
+        with self._lock:
+            if not self.path or not self.dirty:
+                return
+            counts = {api_id: list(buckets) for api_id, buckets in self.counts.items()}
+            self.dirty = False
+        try:
+            with open(self.path, 'w') as f:
+                json.dump(counts, f)
+        except Exception as e:
+            print(f"Error saving usage profile: {e}")
+
+
+class Prefetcher:
+    """
+    Keeps the data for enabled APIs' default queries warm. Each API refreshes every idle_interval,
+    and every interval around the times of day it is usually asked about.
+    """
+
+    def __init__(self, get_config, settings=None):
+        self.get_config = get_config
+        self.settings = dict(DEFAULT_PREFETCH_CONFIG)
+        self.settings.update(settings or {})
+        self.usage = UsageProfile(self.settings["profile_path"])
+        self.jobs = {}  # api_id -> (refresh, age)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, api_id, refresh, age):
+        """
+        refresh() fetches the API's default data; age() returns seconds since it was last fetched
+        (None if never). Jobs only run while the API is enabled in the config.
+        """
+        self.jobs[api_id] = (refresh, age)
+
+    def record_usage(self, api_id):
+        # The profile only steers prefetching, so nothing is learned while it is disabled
+        if self.settings["enabled"]:
+            self.usage.record(api_id)
+
+    def start(self):
+        if self.settings["enabled"] and self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.usage.save()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_due_jobs()
+            self.usage.save()
+            self._stop.wait(self.settings["tick"])
+
+    def run_due_jobs(self):
+        apis = self.get_config()["apis"]
+        for api_id, (refresh, age) in list(self.jobs.items()):
+            if not apis.get(api_id, {}).get("enabled"):
+                continue
+            expected = self.usage.expected_soon(api_id, self.settings["lead_minutes"], self.settings["min_usage"])
+            interval = self.settings["interval"] if expected else self.settings["idle_interval"]
+            try:
+                current_age = age()
+                if current_age is None or current_age >= interval:
+                    refresh()
+            except Exception as e:
+                print(f"Error prefetching {api_id}: {e}")
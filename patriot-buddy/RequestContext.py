@@ -0,0 +1,56 @@
+import itertools
+import threading
+
+_request_ids = itertools.count(1)
+
+
+class RequestContext:
+    """
+    Identifies one utterance as it moves through the pipeline and lets a newer utterance cancel it.
+    Work checks `cancelled` cooperatively; blocking I/O registers a callback to be interrupted.
+    """
+
+    def __init__(self, session="local", parent=None):
+        """A context with a parent, e.g. for speculative work, is cancelled along with it"""
+        self.id = next(_request_ids)
+        self.session = session  # Who asked, so one talker cannot crowd out the others
+        self._cancelled = threading.Event()
+        self.trace = None  # Tracing.Trace for this interaction, if tracing is on
+        self._callbacks = []
+        self._lock = threading.Lock()
+        if parent is not None:
+            self.session = parent.session
+            parent.on_cancel(self.cancel)
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self._cancelled.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error cancelling request {self.id}: {e}")
+
+    def on_cancel(self, callback):
+        """
+        Run callback when the request is cancelled (right away if it already was).
+        Returns a function that unregisters it once the guarded work is finished.
+        """
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
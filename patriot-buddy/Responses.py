@@ -0,0 +1,37 @@
+# Fixed responses the assistant speaks. Keeping them in one place lets their audio be pre-synthesized.
+
+CONVERSATION_ERROR = "I'm having trouble connecting to my thinking module. Can you try again?"
+
+DEVICE_DONE = "I've turned the {target} {state} for you."
+DEVICE_ERROR = "I tried to turn the {target} {state}, but there was an error."
+DEVICE_PARTIAL = "I turned {count} of the {total} {target} {state}, but the rest didn't respond."
+DEVICE_SUPERSEDED = "A later request came in, so the {target} ended up {state} instead."
+UNKNOWN_DEVICE = "I'm not sure which device you mean. I can turn these on or off: {targets}."
+# The default setup's answers, filled in ahead of time so they can be pre-synthesized
+LIGHTS_ON = DEVICE_DONE.format(target="lights", state="on")
+LIGHTS_OFF = DEVICE_DONE.format(target="lights", state="off")
+LIGHTS_ON_ERROR = DEVICE_ERROR.format(target="lights", state="on")
+LIGHTS_OFF_ERROR = DEVICE_ERROR.format(target="lights", state="off")
+HOME_AUTOMATION_ERROR = "I had trouble understanding your home automation request."
+
+UNSUPPORTED_DATA = "I don't have access to that type of external data yet."
+EXTERNAL_API_ERROR = "I had trouble connecting to external data sources."
+WEATHER_DISABLED = "Weather information is currently disabled. You can enable it in settings."
+WEATHER_ERROR = "I had trouble getting the weather information."
+STOCKS_DISABLED = "Stock information is currently disabled. You can enable it in settings."
+STOCKS_ERROR = "I had trouble getting the stock information."
+
+STATIC_RESPONSES = [
+    CONVERSATION_ERROR,
+    LIGHTS_ON,
+    LIGHTS_OFF,
+    LIGHTS_ON_ERROR,
+    LIGHTS_OFF_ERROR,
+    HOME_AUTOMATION_ERROR,
+    UNSUPPORTED_DATA,
+    EXTERNAL_API_ERROR,
+    WEATHER_DISABLED,
+    WEATHER_ERROR,
+    STOCKS_DISABLED,
+    STOCKS_ERROR
+]
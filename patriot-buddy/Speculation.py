@@ -0,0 +1,159 @@
+import threading
+import time
+from Executor import StageBusy
+from RequestContext import RequestContext
+
+DEFAULT_SPECULATION_CONFIG = {
+    "enabled": False,
+    "min_probability": 0.25,
+    "timeout": 10
+}
+
+
+class TokenRelay:
+    """Buffers a speculative generation's tokens until it is adopted, then forwards them live"""
+
+    def __init__(self):
+        self.tokens = []
+        self.target = None
+        self._lock = threading.Lock()
+
+    def feed(self, token):
+        with self._lock:
+            if self.target is None:
+                self.tokens.append(token)
+            else:
+                self.target(token)
+
+    def attach(self, target):
+        with self._lock:
+            for token in self.tokens:
+                target(token)
+            self.tokens = []
+            self.target = target
+
+
+class Branch:
+    def __init__(self, name, ctx):
+        self.name = name
+        self.ctx = ctx
+        self.started = time.perf_counter()
+        self.finished = None
+        self.future = None
+        self.relay = None
+
+
+class Speculation:
+    """The branches started for one request. Exactly one may be adopted; the rest are cancelled."""
+
+    def __init__(self, speculator, ctx):
+        self.speculator = speculator
+        self.ctx = ctx
+        self.branches = {}
+        self.settled = False
+
+    def start(self, name, fn, relay=None):
+        """Run fn(child_ctx) on the speculation stage; it must not have side effects"""
+        branch = Branch(name, RequestContext(parent=self.ctx))
+        branch.relay = relay
+
+        def run():
+            try:
+                return fn(branch.ctx)
+            finally:
+                branch.finished = time.perf_counter()
+
+        try:
+            branch.future = self.speculator.executor.submit("speculation", run)
+        except StageBusy:
+            return None
+        self.branches[name] = branch
+        self.speculator.count(name, "launched")
+        return branch
+
+    def adopt(self, name, accept=None):
+        """
+        Keep the named branch and cancel the others. Returns the branch, or None if it was not started,
+        failed, or accept(result) rejects what it computed.
+        """
+        branch = self.branches.get(name)
+        adopted = None
+        if branch is not None and not self.settled:
+            if accept is None:
+                adopted = branch
+            else:
+                try:
+                    if accept(branch.future.result(timeout=self.speculator.timeout)):
+                        adopted = branch
+                except Exception as e:
+                    print(f"Error in speculative {name}: {e}")
+        self.settle(adopted)
+        return adopted
+
+    def discard(self):
+        """Cancel every branch, e.g. before an action with side effects"""
+        self.settle(None)
+
+    def settle(self, adopted):
+        if self.settled:
+            return
+        self.settled = True
+        now = time.perf_counter()
+        for branch in self.branches.values():
+            end = min(branch.finished or now, now)
+            if branch is adopted:
+                # Work that overlapped classification instead of following it
+                self.speculator.record(self.ctx, branch, "adopted", end - branch.started, branch.started, end)
+            else:
+                branch.ctx.cancel()
+                self.speculator.record(self.ctx, branch, "wasted", end - branch.started, branch.started, end)
+
+
+class Speculator:
+    """
+    Starts likely handlers' side-effect-free work while the intent is still being classified,
+    and keeps totals of the work that was adopted (time saved) and thrown away (time wasted).
+    """
+
+    def __init__(self, executor, min_probability=DEFAULT_SPECULATION_CONFIG["min_probability"],
+                 timeout=DEFAULT_SPECULATION_CONFIG["timeout"]):
+        self.executor = executor
+        self.min_probability = min_probability
+        self.timeout = timeout
+        self.totals = {}  # branch name -> counters
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, executor):
+        """Build from the "speculation" section, or return None if it is disabled"""
+        settings = dict(DEFAULT_SPECULATION_CONFIG)
+        settings.update(config.get("speculation", {}))
+        if not settings["enabled"]:
+            return None
+        return cls(executor, settings["min_probability"], settings["timeout"])
+
+    def begin(self, ctx):
+        return Speculation(self, ctx)
+
+    def _totals(self, name):
+        return self.totals.setdefault(name, {"launched": 0, "adopted": 0, "wasted": 0,
+                                             "saved_seconds": 0.0, "wasted_seconds": 0.0})
+
+    def count(self, name, key):
+        with self._lock:
+            self._totals(name)[key] += 1
+
+    def record(self, ctx, branch, outcome, seconds, start, end):
+        with self._lock:
+            totals = self._totals(branch.name)
+            totals[outcome] += 1
+            totals["saved_seconds" if outcome == "adopted" else "wasted_seconds"] += seconds
+        trace = getattr(ctx, "trace", None)
+        if trace is not None:
+            trace.add(f"speculate_{branch.name}", start, end, outcome=outcome)
+
+    def stats(self):
+        with self._lock:
+            return {name: {key: round(value, 4) if isinstance(value, float) else value
+                           for key, value in totals.items()}
+                    for name, totals in self.totals.items()}
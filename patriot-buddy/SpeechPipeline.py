@@ -0,0 +1,268 @@
+import queue
+import re
+import shutil
+import subprocess
+import threading
+from Executor import StageBusy
+from Tracing import span
+
+DEFAULT_TTS_CONFIG = {
+    "model_id": "eleven_multilingual_v2",
+    "output_format": "mp3_44100_128",
+    "stability": 0.5,
+    "similarity_boost": 0.75
+}
+
+# End of a sentence: terminal punctuation, optional closing quote/bracket, then whitespace
+SENTENCE_END = re.compile(r'[.!?]+["\')\]]*\s+')
+ABBREVIATIONS = ("mr.", "mrs.", "ms.", "dr.", "st.", "vs.", "e.g.", "i.e.", "etc.")
+
+
+class SentenceChunker:
+    """Splits a stream of tokens into complete sentences"""
+
+    def __init__(self, min_length=12):
+        self.min_length = min_length
+        self.buffer = ""
+
+    def feed(self, token):
+        """Add a token and return any sentences it completed"""
+        self.buffer += token
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            candidate = self.buffer[start:match.end()].strip()
+            last_word = candidate.rsplit(None, 1)[-1].lower()
+            # Very short fragments and abbreviations stay attached to the next sentence
+            if len(candidate) < self.min_length or last_word in ABBREVIATIONS:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self):
+        """Return whatever text is left once the stream has ended"""
+        remainder = self.buffer.strip()
+        self.buffer = ""
+        return [remainder] if remainder else []
+
+
+def synthesize(client, voice_id, tts_config, text, audio_cache=None, ctx=None):
+    """
+    Convert one sentence to audio bytes, reusing cached audio when available.
+    Returns None if the RequestContext ctx is cancelled while the audio is downloading.
+    """
+    from elevenlabs import VoiceSettings
+
+    voice_settings = {
+        "stability": tts_config["stability"],
+        "similarity_boost": tts_config["similarity_boost"]
+    }
+    key = None
+    if audio_cache is not None:
+        key = audio_cache.key(text, voice_id, tts_config["model_id"], tts_config["output_format"],
+                              voice_settings)
+        audio = audio_cache.get(key)
+        if audio is not None:
+            return audio
+
+    chunks = client.text_to_speech.convert(
+        text=text,
+        voice_id=voice_id,
+        model_id=tts_config["model_id"],
+        output_format=tts_config["output_format"],
+        voice_settings=VoiceSettings(**voice_settings)
+    )
+    audio = bytearray()
+    for chunk in chunks:
+        if ctx is not None and ctx.cancelled:
+            # Closing the generator aborts the ElevenLabs HTTP stream
+            if hasattr(chunks, "close"):
+                chunks.close()
+            return None
+        audio.extend(chunk)
+    audio = bytes(audio)
+    if key is not None:
+        audio_cache.put(key, audio)
+    return audio
+
+
+def play(audio, ctx=None):
+    """Play audio through ffplay; cancelling ctx stops playback immediately"""
+    if not shutil.which("ffplay"):
+        raise ValueError("ffplay from ffmpeg is required to play audio")
+    process = subprocess.Popen(["ffplay", "-autoexit", "-", "-nodisp"], stdin=subprocess.PIPE,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    unregister = ctx.on_cancel(process.kill) if ctx is not None else None
+    try:
+        process.communicate(input=audio)
+    except (BrokenPipeError, ValueError):
+        pass  # The player was killed while audio was still being written
+    finally:
+        if unregister is not None:
+            unregister()
+
+
+def prewarm(client, voice_id, tts_config, audio_cache, phrases):
+    """Fill the audio cache with the sentences of phrases that are spoken often"""
+    settings = dict(DEFAULT_TTS_CONFIG)
+    settings.update(tts_config or {})
+    for phrase in phrases:
+        # Split exactly as the pipeline will so the cached sentences match at playback time
+        chunker = SentenceChunker()
+        for sentence in chunker.feed(phrase + " ") + chunker.flush():
+            try:
+                synthesize(client, voice_id, settings, sentence, audio_cache)
+            except Exception as e:
+                print(f"Error pre-warming TTS cache: {e}")
+                return
+
+
+class SpeechPipeline:
+    """
+    Speaks a response sentence by sentence: sentence N+1 is synthesized while sentence N plays,
+    so audio starts as soon as the first sentence is complete.
+    """
+
+    # Synthesis and playback tasks are queued as a pair so their order matches across both stages
+    _submit_lock = threading.Lock()
+
+    def __init__(self, client, voice_id, tts_config=None, audio_cache=None, executor=None, ctx=None,
+                 player=None):
+        self.client = client
+        self.player = player or play
+        self.voice_id = voice_id
+        self.audio_cache = audio_cache
+        self.ctx = ctx
+        self.tts_config = dict(DEFAULT_TTS_CONFIG)
+        self.tts_config.update(tts_config or {})
+
+        self.chunker = SentenceChunker()
+        self.has_text = False
+        self.dropped = False
+        self.finished = threading.Event()
+        self.done_callbacks = []
+        self._done_lock = threading.Lock()
+        self.text_queue = queue.Queue()
+        # Holding one finished clip keeps synthesis exactly one sentence ahead of playback
+        self.audio_queue = queue.Queue(maxsize=1)
+
+        if ctx is not None:
+            ctx.on_cancel(self.cancel)
+
+        if executor is None:
+            threading.Thread(target=self._synth_loop, daemon=True).start()
+            threading.Thread(target=self._play_loop, daemon=True).start()
+            return
+
+        with self._submit_lock:
+            try:
+                executor.submit("tts", self._synth_loop)
+            except StageBusy as e:
+                print(f"Dropping speech: {e}")
+                self.dropped = True
+                self.finished.set()
+                return
+            try:
+                executor.submit("playback", self._play_loop)
+            except StageBusy as e:
+                print(f"Dropping speech: {e}")
+                self.dropped = True
+                self.finished.set()
+                self.text_queue.put(None)
+
+    def feed(self, token):
+        """Add streamed text; complete sentences are queued for synthesis right away"""
+        if self.dropped:
+            return
+        if token:
+            self.has_text = True
+        for sentence in self.chunker.feed(token):
+            self.text_queue.put(sentence)
+
+    def say(self, text):
+        """Queue a whole response"""
+        self.feed(text + " ")
+
+    def finish(self):
+        """Mark the end of the response so the remaining text is spoken and the workers exit"""
+        if self.dropped:
+            return
+        for sentence in self.chunker.flush():
+            self.text_queue.put(sentence)
+        self.text_queue.put(None)
+
+    def cancel(self):
+        """Drop everything not yet spoken; the current clip is stopped through ctx"""
+        self.dropped = True
+        for pending in (self.text_queue, self.audio_queue):
+            try:
+                while True:
+                    pending.get_nowait()
+            except queue.Empty:
+                pass
+        self.text_queue.put(None)
+        try:
+            self.audio_queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def wait(self, timeout=None):
+        """Block until everything queued has been played"""
+        return self.finished.wait(timeout)
+
+    def add_done_callback(self, callback):
+        """Call callback() once everything has been played or dropped (right away if it already has)"""
+        with self._done_lock:
+            if not self.finished.is_set():
+                self.done_callbacks.append(callback)
+                return
+        callback()
+
+    def _set_finished(self):
+        with self._done_lock:
+            self.finished.set()
+            callbacks, self.done_callbacks = self.done_callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error in speech callback: {e}")
+
+    def synthesize(self, text):
+        """Convert one sentence to audio bytes"""
+        with span(self.ctx, "tts", characters=len(text)):
+            return synthesize(self.client, self.voice_id, self.tts_config, text, self.audio_cache, self.ctx)
+
+    def _synth_loop(self):
+        while True:
+            sentence = self.text_queue.get()
+            if self.dropped:
+                return  # cancel() has already told the player to stop
+            if sentence is None:
+                self.audio_queue.put(None)
+                return
+            try:
+                audio = self.synthesize(sentence)
+                if audio is not None and not self.dropped:
+                    self.audio_queue.put(audio)
+            except Exception as e:
+                print(f"Text-to-speech error: {e}")
+
+    def _play_loop(self):
+        try:
+            while True:
+                audio = self.audio_queue.get()
+                if audio is None or self.dropped:
+                    return
+                trace = getattr(self.ctx, "trace", None)
+                if trace is not None:
+                    trace.mark("first_audio")
+                try:
+                    with span(self.ctx, "playback"):
+                        self.player(audio, self.ctx)
+                except Exception as e:
+                    print(f"Audio playback error: {e}")
+        finally:
+            self._set_finished()
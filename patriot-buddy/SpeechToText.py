@@ -0,0 +1,104 @@
+import json
+import speech_recognition as sr
+
+DEFAULT_STT_CONFIG = {
+    "backend": "google",
+    "language": "en-US",
+    "model_path": "patriot-buddy/vosk-model-small-en-us-0.15"
+}
+
+
+class SttBackend:
+    """
+    Speech-to-text engine used by the Listener. Streaming backends decode frames while the user is
+    still speaking and can report partial transcripts; batch backends only see the finished audio.
+    Failures are reported with speech_recognition's UnknownValueError and RequestError.
+    """
+    streaming = False
+
+    def start(self):
+        """Begin a new utterance"""
+
+    def accept(self, frame):
+        """Decode one frame; returns the partial transcript so far, or None"""
+        return None
+
+    def finish(self, audio):
+        """Return the final transcript for the utterance's AudioData"""
+        raise NotImplementedError
+
+
+class GoogleBackend(SttBackend):
+    """Google Web Speech API, as used by speech_recognition's recognize_google"""
+
+    def __init__(self, language="en-US"):
+        self.recognizer = sr.Recognizer()
+        self.language = language
+
+    def finish(self, audio):
+        return self.recognizer.recognize_google(audio, language=self.language)
+
+
+class SphinxBackend(SttBackend):
+    """Offline CMU PocketSphinx decoding of the whole utterance"""
+
+    def __init__(self, language="en-US"):
+        self.recognizer = sr.Recognizer()
+        self.language = language
+
+    def finish(self, audio):
+        return self.recognizer.recognize_sphinx(audio, language=self.language)
+
+
+class VoskBackend(SttBackend):
+    """Offline Vosk (Kaldi) decoder that runs while audio is still arriving and emits partials"""
+    streaming = True
+
+    def __init__(self, model_path, sample_rate):
+        try:
+            import vosk
+        except ImportError:
+            raise sr.RequestError("missing Vosk module: pip install vosk")
+        vosk.SetLogLevel(-1)
+        self.vosk = vosk
+        self.model = vosk.Model(model_path)  # Loaded once and shared by every utterance
+        self.sample_rate = sample_rate
+        self.recognizer = None
+        self.segments = []
+
+    def start(self):
+        self.recognizer = self.vosk.KaldiRecognizer(self.model, self.sample_rate)
+        self.segments = []
+
+    def accept(self, frame):
+        if self.recognizer.AcceptWaveform(frame):
+            # Vosk finalized a segment at an internal pause
+            text = json.loads(self.recognizer.Result()).get("text", "")
+            if text:
+                self.segments.append(text)
+            partial = ""
+        else:
+            partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        return " ".join(self.segments + ([partial] if partial else [])) or None
+
+    def finish(self, audio):
+        text = json.loads(self.recognizer.FinalResult()).get("text", "")
+        transcript = " ".join(self.segments + ([text] if text else []))
+        self.recognizer = None
+        if not transcript:
+            raise sr.UnknownValueError()
+        return transcript
+
+
+def create_backend(settings, sample_rate):
+    """Build the backend named in the "stt" config section, falling back to Google"""
+    config = dict(DEFAULT_STT_CONFIG)
+    config.update(settings or {})
+    try:
+        if config["backend"] == "vosk":
+            return VoskBackend(config["model_path"], sample_rate)
+        if config["backend"] == "sphinx":
+            return SphinxBackend(config["language"])
+    except Exception as e:
+        print(f"Error loading {config['backend']} speech recognition, using Google instead: {e}")
+    return GoogleBackend(config["language"])
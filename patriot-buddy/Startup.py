@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+import time
+
+# Imported first by main.py, so this is as close to process start as Python code can see
+STARTED = time.perf_counter()
+
+marks = {}
+report_requested = False
+
+
+def mark(name):
+    """Record the first time a startup milestone is reached, in seconds since launch"""
+    marks.setdefault(name, time.perf_counter() - STARTED)
+
+
+def import_breakdown(module, limit=12):
+    """
+    Import module in a fresh interpreter with -X importtime.
+    Returns (total seconds, [(package, seconds), ...]) for its direct imports, slowest first.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    children = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # The header line
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        seconds = int(cumulative) / 1e6
+        if depth == 0:
+            if name.strip() == module:
+                children.sort(key=lambda child: child[1], reverse=True)
+                return seconds, children[:limit]
+            children = []  # Imports that belonged to interpreter startup
+        elif depth == 1:
+            children.append((name.strip(), seconds))
+    raise RuntimeError(f"Could not import {module}: {result.stderr.strip().splitlines()[-1:]}")
+
+
+def report(modules=("VoiceAssistantGUI", "AssistantCore")):
+    """Startup milestones followed by the import-time breakdown of each module"""
+    lines = ["Startup milestones:"]
+    for name, seconds in sorted(marks.items(), key=lambda item: item[1]):
+        lines.append(f"  {name:<24}{seconds * 1000:>8.0f} ms")
+    for module in modules:
+        try:
+            total, children = import_breakdown(module)
+        except Exception as e:
+            lines.append(f"import {module}: {e}")
+            continue
+        lines.append(f"import {module}: {total * 1000:.0f} ms")
+        for name, seconds in children:
+            lines.append(f"  {name:<24}{seconds * 1000:>8.1f} ms  {seconds / total * 100:>4.0f}%")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print(report(sys.argv[1:] or ("VoiceAssistantGUI", "AssistantCore")))
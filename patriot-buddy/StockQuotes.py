@@ -0,0 +1,273 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import requests
+from Executor import StageBusy
+
+ALPHAVANTAGE_URL = "https://www.alphavantage.co/query"
+BULK_LIMIT = 100  # Symbols per REALTIME_BULK_QUOTES call
+
+MARKET_TIMEZONE = "America/New_York"
+MARKET_OPEN = (9, 30)
+MARKET_CLOSE = (16, 0)
+
+
+def market_time():
+    """The current time on the exchange's clock, or None if the timezone database is missing"""
+    try:
+        from zoneinfo import ZoneInfo
+        return datetime.now(ZoneInfo(MARKET_TIMEZONE))
+    except Exception:
+        return None
+
+
+def seconds_until_open(now):
+    """Seconds from a closed-market moment until the next regular session opens (holidays are ignored)"""
+    opens = now.replace(hour=MARKET_OPEN[0], minute=MARKET_OPEN[1], second=0, microsecond=0)
+    if now >= opens:
+        opens += timedelta(days=1)
+    while opens.weekday() >= 5:
+        opens += timedelta(days=1)
+    return (opens - now).total_seconds()
+
+
+def market_ttl(ttl, now=None):
+    """
+    How long a quote stays fresh: ttl while the market is open, and until the next open
+    while it is closed, since prices do not move in between
+    """
+    now = now or market_time()
+    if now is None:
+        return ttl
+    minutes = now.hour * 60 + now.minute
+    is_open = (now.weekday() < 5
+               and MARKET_OPEN[0] * 60 + MARKET_OPEN[1] <= minutes < MARKET_CLOSE[0] * 60 + MARKET_CLOSE[1])
+    return ttl if is_open else max(ttl, seconds_until_open(now))
+
+
+class TokenBucket:
+    """Spaces upstream calls to a per-minute quota; callers over the quota wait their turn"""
+
+    def __init__(self, per_minute, burst=None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst or per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.waits = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait):
+        """Take a token, waiting up to max_wait seconds for one; returns False if none came in time"""
+        deadline = time.monotonic() + max_wait
+        waited = False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.waits += waited
+                    return True
+                delay = (1 - self.tokens) / self.rate
+            if now + delay > deadline:
+                return False
+            waited = True
+            time.sleep(delay)
+
+    def drain(self):
+        """The provider says the quota is used up, whatever our own count says"""
+        with self._lock:
+            self.tokens = 0.0
+            self.updated = time.monotonic()
+
+
+class _Flight:
+    """A symbol being fetched that concurrent callers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class StockQuotes:
+    """
+    Alpha Vantage quotes with a market-hours-aware cache. Concurrent requests for a symbol share
+    one upstream call, symbols requested together are fetched in one batch where the plan allows
+    it, and every call waits for the rate limiter instead of being refused by the provider.
+    """
+
+    def __init__(self, api_key, url=ALPHAVANTAGE_URL, ttl=60, requests_per_minute=5, batch=False,
+                 batch_window=0.05, max_wait=15, timeout=5, executor=None):
+        self.api_key = api_key
+        self.url = url
+        self.ttl = ttl
+        self.batch = batch
+        self.batch_window = batch_window
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.executor = executor
+        self.bucket = TokenBucket(requests_per_minute)
+        self.session = requests.Session()
+
+        self.cache = {}  # symbol -> (fetched_at, expires_at, quote)
+        self.in_flight = {}  # symbol -> _Flight
+        self.pending = []  # Symbols waiting for the next upstream call
+        self.upstream_calls = 0
+        self.cache_hits = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, executor=None):
+        """Build the service from the "stocks" API entry"""
+        stocks_config = config["apis"]["stocks"]
+        return cls(stocks_config["key"],
+                   url=stocks_config.get("url", ALPHAVANTAGE_URL),
+                   ttl=stocks_config.get("cache_ttl", 60),
+                   requests_per_minute=stocks_config.get("requests_per_minute", 5),
+                   batch=stocks_config.get("batch", False),
+                   batch_window=stocks_config.get("batch_window", 0.05),
+                   max_wait=stocks_config.get("max_wait", 15),
+                   executor=executor)
+
+    def get(self, symbol):
+        """
+        Return {"symbol", "price", "change", "change_percent", "volume"} for a ticker,
+        or None if the provider could not answer
+        """
+        return self.get_many([symbol])[symbol.strip().upper()]
+
+    def get_many(self, symbols):
+        """Quotes for several tickers, keyed by upper-case symbol, fetched together"""
+        symbols = [symbol.strip().upper() for symbol in symbols]
+        results = {}
+        flights = {}
+        flusher = False
+        with self._lock:
+            now = time.time()
+            for symbol in symbols:
+                entry = self.cache.get(symbol)
+                if entry is not None and now < entry[1]:
+                    results[symbol] = entry[2]
+                    self.cache_hits += 1
+                    continue
+                flight = self.in_flight.get(symbol)
+                if flight is None:
+                    flight = self.in_flight[symbol] = _Flight()
+                    # Whoever starts a batch sends it; later symbols ride along
+                    flusher = flusher or not self.pending
+                    self.pending.append(symbol)
+                flights[symbol] = flight
+
+        if flusher:
+            if self.batch and self.batch_window > 0:
+                time.sleep(self.batch_window)
+            self._flush()
+        for symbol, flight in flights.items():
+            flight.done.wait(self.max_wait + self.timeout * 2)
+            results[symbol] = flight.result
+        return results
+
+    def refresh(self, symbol):
+        """Fetch a symbol in the background unless its cached quote is still fresh"""
+        with self._lock:
+            entry = self.cache.get(symbol.strip().upper())
+        if entry is not None and time.time() < entry[1]:
+            return
+        if self.executor is None:
+            threading.Thread(target=self._refresh, args=(symbol,), daemon=True).start()
+            return
+        try:
+            self.executor.submit("background", self._refresh, symbol)
+        except StageBusy:
+            pass
+
+    def _refresh(self, symbol):
+        try:
+            self.get(symbol)
+        except Exception as e:
+            print(f"Error refreshing quote for {symbol}: {e}")
+
+    def age(self, symbol):
+        """Seconds since the symbol was fetched, or None if it is not cached"""
+        with self._lock:
+            entry = self.cache.get(symbol.strip().upper())
+        return None if entry is None else time.time() - entry[0]
+
+    def _flush(self):
+        with self._lock:
+            symbols, self.pending = self.pending, []
+        quotes = {}
+        try:
+            if self.batch:
+                for start in range(0, len(symbols), BULK_LIMIT):
+                    quotes.update(self._fetch_bulk(symbols[start:start + BULK_LIMIT]))
+            else:
+                for symbol in symbols:
+                    quote = self._fetch_quote(symbol)
+                    if quote is not None:
+                        quotes[symbol] = quote
+        except Exception as e:
+            print(f"Error fetching stock quotes: {e}")
+        finally:
+            fetched_at = time.time()
+            expires_at = fetched_at + market_ttl(self.ttl)
+            with self._lock:
+                for symbol in symbols:
+                    quote = quotes.get(symbol)
+                    if quote is not None:
+                        self.cache[symbol] = (fetched_at, expires_at, quote)
+                    flight = self.in_flight.pop(symbol)
+                    flight.result = quote
+                    flight.done.set()
+
+    def _call(self, params):
+        """One rate-limited upstream call; None if the quota or provider refused it"""
+        if not self.bucket.acquire(self.max_wait):
+            print("Stock quote quota exhausted; try again in a minute")
+            return None
+        with self._lock:
+            self.upstream_calls += 1
+        response = self.session.get(self.url, params=dict(params, apikey=self.api_key), timeout=self.timeout)
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        if "Note" in data or "Information" in data:
+            # Alpha Vantage answers over-quota calls with 200 and a note
+            self.bucket.drain()
+            return None
+        return data
+
+    def _fetch_quote(self, symbol):
+        data = self._call({"function": "GLOBAL_QUOTE", "symbol": symbol})
+        quote = (data or {}).get("Global Quote") or {}
+        if not quote.get("05. price"):
+            return None
+        return {
+            "symbol": quote["01. symbol"],
+            "price": float(quote["05. price"]),
+            "change": float(quote["09. change"]),
+            "change_percent": float(quote["10. change percent"].rstrip("%")),
+            "volume": int(quote["06. volume"])
+        }
+
+    def _fetch_bulk(self, symbols):
+        data = self._call({"function": "REALTIME_BULK_QUOTES", "symbol": ",".join(symbols)})
+        quotes = {}
+        for quote in (data or {}).get("data", []):
+            try:
+                quotes[quote["symbol"].upper()] = {
+                    "symbol": quote["symbol"].upper(),
+                    "price": float(quote["close"]),
+                    "change": float(quote["change"]),
+                    "change_percent": float(str(quote["change_percent"]).rstrip("%")),
+                    "volume": int(float(quote["volume"]))
+                }
+            except (KeyError, TypeError, ValueError):
+                continue
+        return quotes
+
+    def stats(self):
+        with self._lock:
+            return {"upstream_calls": self.upstream_calls, "cache_hits": self.cache_hits,
+                    "cached": len(self.cache), "rate_limited_waits": self.bucket.waits}
@@ -0,0 +1,256 @@
+import argparse
+import csv
+import mmap
+import os
+import re
+import struct
+import time
+
+DEFAULT_SYMBOLS_CSV = "patriot-buddy/symbols.csv"
+DEFAULT_SYMBOLS_INDEX = "patriot-buddy/symbols.idx"
+
+# File layout: header, symbol table, sorted key records, then one blob of UTF-8 strings.
+# Every lookup is a binary search over the records straight from the mapped file.
+MAGIC = b"PBSYMIX1"
+HEADER = struct.Struct("<8sII")  # magic, symbol count, record count
+SYMBOL = struct.Struct("<IH")  # ticker offset and length in the blob
+RECORD = struct.Struct("<IHHB")  # key offset and length in the blob, symbol id, kind
+
+TICKER, PHRASE, TOKEN = 0, 1, 2
+
+NAME_SUFFIXES = {"inc", "incorporated", "corporation", "corp", "company", "co", "group", "holdings", "holding",
+                 "plc", "ltd", "limited", "sa", "se", "nv", "the", "trust", "etf", "com", "us"}
+# Words in a stock request that never name the company
+STOPWORDS = {"what", "whats", "is", "the", "stock", "stocks", "price", "prices", "share", "shares", "of", "how",
+             "doing", "today", "trading", "at", "for", "me", "tell", "about", "quote", "check", "current",
+             "currently", "value", "market", "look", "up", "please", "can", "you", "give", "in", "on", "a", "an",
+             "and", "its", "it", "does", "did", "was", "are", "worth", "right", "now", "much", "cost"}
+
+# Shortest word matched by prefix or edit distance rather than exactly
+MIN_GUESS_LENGTH = 5
+
+TICKER_PATTERN = re.compile(r"^[A-Z]{1,5}(\.[A-Z])?$")
+
+
+def normalize(text):
+    """Lower-case words with '&' spelled out and punctuation dropped, so "Coca-Cola" matches "coca cola" """
+    text = text.lower().replace("&", " and ").replace("'", "").replace("-", " ")
+    return re.findall(r"[a-z0-9]+", text)
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance, or limit + 1 as soon as it is certain to exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def build(csv_path=DEFAULT_SYMBOLS_CSV):
+    """Compile the symbols CSV (symbol, name, aliases separated by ';') into the binary index format"""
+    symbols = []
+    keys = set()
+    token_owners = {}
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            symbol_id = len(symbols)
+            ticker = row["symbol"].strip().upper()
+            symbols.append(ticker)
+            keys.add((ticker.lower(), symbol_id, TICKER))
+            name_words = [word for word in normalize(row["name"]) if word not in NAME_SUFFIXES]
+            phrases = [" ".join(name_words)] + [" ".join(normalize(alias))
+                                                 for alias in row.get("aliases", "").split(";")]
+            for phrase in phrases:
+                if phrase:
+                    keys.add((phrase, symbol_id, PHRASE))
+            for word in set(name_words):
+                token_owners.setdefault(word, set()).add(symbol_id)
+
+    # Single name words only help prefix and fuzzy matching when they point at one company
+    for word, owners in token_owners.items():
+        if len(owners) == 1 and len(word) >= 3:
+            keys.add((word, next(iter(owners)), TOKEN))
+
+    blob = bytearray()
+    symbol_table = []
+    for ticker in symbols:
+        data = ticker.encode()
+        symbol_table.append(SYMBOL.pack(len(blob), len(data)))
+        blob += data
+    records = []
+    for key, symbol_id, kind in sorted(keys, key=lambda entry: (entry[0].encode(), entry[2], entry[1])):
+        data = key.encode()
+        records.append(RECORD.pack(len(blob), len(data), symbol_id, kind))
+        blob += data
+    return HEADER.pack(MAGIC, len(symbols), len(records)) + b"".join(symbol_table) + b"".join(records) + bytes(blob)
+
+
+class SymbolIndex:
+    """
+    Ticker lookup for spoken stock requests: exact tickers, company names and aliases, unique
+    name prefixes, then near-misses by edit distance. Reads a memory-mapped file; typical lookups
+    take 20-250 microseconds, and up to about a millisecond when they fall through to edit distance.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        magic, self.symbol_count, self.record_count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("not a symbol index")
+        self.symbols_at = HEADER.size
+        self.records_at = self.symbols_at + self.symbol_count * SYMBOL.size
+        self.blob_at = self.records_at + self.record_count * RECORD.size
+
+    @classmethod
+    def from_config(cls, config):
+        """Load the index named by the "stocks" API entry"""
+        stocks_config = config["apis"]["stocks"]
+        return cls.load(stocks_config.get("symbols_index", DEFAULT_SYMBOLS_INDEX),
+                        stocks_config.get("symbols_csv", DEFAULT_SYMBOLS_CSV))
+
+    @classmethod
+    def load(cls, index_path=DEFAULT_SYMBOLS_INDEX, csv_path=DEFAULT_SYMBOLS_CSV):
+        """Map the compiled index, rebuilding it first if the CSV is newer; None if neither exists"""
+        try:
+            if os.path.exists(csv_path) and (not os.path.exists(index_path)
+                                             or os.path.getmtime(csv_path) > os.path.getmtime(index_path)):
+                data = build(csv_path)
+                try:
+                    with open(index_path, "wb") as f:
+                        f.write(data)
+                except OSError:
+                    return cls(data)  # Read-only install: use the freshly built index from memory
+            with open(index_path, "rb") as f:
+                return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except Exception as e:
+            print(f"Error loading symbol index: {e}")
+            return None
+
+    def ticker(self, symbol_id):
+        offset, length = SYMBOL.unpack_from(self.data, self.symbols_at + symbol_id * SYMBOL.size)
+        start = self.blob_at + offset
+        return self.data[start:start + length].decode()
+
+    def _record(self, index):
+        offset, length, symbol_id, kind = RECORD.unpack_from(self.data, self.records_at + index * RECORD.size)
+        start = self.blob_at + offset
+        return self.data[start:start + length], symbol_id, kind
+
+    def _lower_bound(self, key):
+        low, high = 0, self.record_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._record(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _starting_with(self, prefix):
+        """(key, symbol id, kind) for every record whose key starts with prefix"""
+        prefix = prefix.encode()
+        index = self._lower_bound(prefix)
+        while index < self.record_count:
+            key, symbol_id, kind = self._record(index)
+            if not key.startswith(prefix):
+                return
+            yield key, symbol_id, kind
+            index += 1
+
+    def exact(self, key, kinds=(TICKER, PHRASE, TOKEN)):
+        """The most popular symbol whose key is exactly key, or None"""
+        best = None
+        for found, symbol_id, kind in self._starting_with(key):
+            if found == key.encode() and kind in kinds and (best is None or symbol_id < best):
+                best = symbol_id
+        return best
+
+    def match(self, text):
+        """The best ticker for a request or slot value like "how's apple doing" or "Micrsoft", or None"""
+        raw = text.strip()
+        # A bare ticker, or one written in capitals inside a sentence
+        candidates = [raw] if " " not in raw else []
+        tickers = [word.strip("$?,.!") for word in raw.split() if TICKER_PATTERN.match(word.strip("$?,.!"))]
+        candidates += tickers
+        for candidate in candidates:
+            symbol_id = self.exact(candidate.lower(), (TICKER,))
+            if symbol_id is not None:
+                return self.ticker(symbol_id)
+
+        # Names and aliases, longest phrase first
+        words = normalize(raw)
+        for size in range(min(5, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                phrase = words[start:start + size]
+                if size == 1 and phrase[0] in STOPWORDS:
+                    continue
+                symbol_id = self.exact(" ".join(phrase), (PHRASE,))
+                if symbol_id is not None:
+                    return self.ticker(symbol_id)
+
+        # An unknown ticker is not a misspelled name
+        skip = STOPWORDS | {ticker.lower() for ticker in tickers if len(ticker) > 1}
+        content = [word for word in words if word not in skip]
+        # Most of a name that only one company has, e.g. "micros" or "qualcom". Short or partial
+        # words are too often something else ("gold" is not Goldman Sachs), so they go to the model.
+        for word in content:
+            if len(word) < MIN_GUESS_LENGTH:
+                continue
+            entries = [(key, symbol_id) for key, symbol_id, kind in self._starting_with(word) if kind != TICKER]
+            owners = {symbol_id for _, symbol_id in entries}
+            if len(owners) == 1 and any(len(word) * 3 >= len(key.split(b" ")[0]) * 2 for key, _ in entries):
+                return self.ticker(owners.pop())
+
+        # Misheard or misspelled names; short words are one letter away from too many others
+        best = None
+        for word in content:
+            if len(word) < MIN_GUESS_LENGTH:
+                continue
+            for key, symbol_id, kind in self._starting_with(word[0]):
+                if kind == TICKER or b" " in key or len(key) < MIN_GUESS_LENGTH:
+                    continue
+                limit = 1 if len(key) <= 7 else 2
+                distance = edit_distance(word, key.decode(), limit)
+                if distance <= limit and (best is None or (distance, symbol_id) < best):
+                    best = (distance, symbol_id)
+        return self.ticker(best[1]) if best is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the offline ticker index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="compile the symbols CSV into the binary index")
+    build_parser.add_argument("--csv", default=DEFAULT_SYMBOLS_CSV)
+    build_parser.add_argument("--index", default=DEFAULT_SYMBOLS_INDEX)
+
+    match_parser = subparsers.add_parser("match", help="look up the ticker for a request")
+    match_parser.add_argument("text")
+    match_parser.add_argument("--index", default=DEFAULT_SYMBOLS_INDEX)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        data = build(args.csv)
+        with open(args.index, "wb") as f:
+            f.write(data)
+        index = SymbolIndex(data)
+        print(f"Indexed {index.symbol_count} symbols under {index.record_count} keys "
+              f"in {len(data)} bytes, saved to {args.index}")
+    else:
+        index = SymbolIndex.load(args.index, csv_path="")
+        started = time.perf_counter()
+        ticker = index.match(args.text)
+        elapsed = time.perf_counter() - started
+        print(f"{ticker} ({elapsed * 1e6:.0f} microseconds)")
+
+
+if __name__ == "__main__":
+    main()
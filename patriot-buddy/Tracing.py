@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from logging.handlers import RotatingFileHandler
+
+DEFAULT_TRACING_CONFIG = {
+    "enabled": True,
+    "path": "patriot-buddy/traces.jsonl",
+    "max_bytes": 1000000,
+    "backups": 3,
+    "prometheus_path": "",
+    "overlay": False
+}
+
+# Histogram buckets in seconds for the Prometheus exporter
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Trace:
+    """
+    Timeline of one interaction. Spans are kept in perf_counter seconds relative to the trace start
+    so timings taken on different threads (capture, listen, command, tts, playback) line up.
+    """
+
+    def __init__(self, request_id, text=None, started=None):
+        self.request_id = request_id
+        self.text = text
+        self.started = started if started is not None else time.perf_counter()
+        self.timestamp = time.time() - (time.perf_counter() - self.started)
+        self.spans = []
+        self.marks = {}
+        self.duration = None
+        self._lock = threading.Lock()
+
+    def add(self, name, start, end, **attrs):
+        """Record a span measured elsewhere from two perf_counter readings"""
+        span = {"name": name, "start": round(start - self.started, 4), "duration": round(end - start, 4)}
+        span.update(attrs)
+        with self._lock:
+            self.spans.append(span)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Time a block; the yielded dict can be filled with extra attributes"""
+        start = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            self.add(name, start, time.perf_counter(), **attrs)
+
+    def mark(self, name):
+        """Note the first time something happened, e.g. the first audio being played"""
+        with self._lock:
+            self.marks.setdefault(name, round(time.perf_counter() - self.started, 4))
+
+    def breakdown(self):
+        """Total seconds per span name"""
+        totals = {}
+        with self._lock:
+            for span in self.spans:
+                totals[span["name"]] = totals.get(span["name"], 0.0) + span["duration"]
+        return totals
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "request_id": self.request_id,
+                "timestamp": round(self.timestamp, 3),
+                "text": self.text,
+                "duration": self.duration,
+                "marks": dict(self.marks),
+                "spans": sorted(self.spans, key=lambda span: span["start"])
+            }
+
+    def summary(self):
+        """Short human-readable breakdown for the developer overlay"""
+        lines = [f"Request {self.request_id}: {self.duration or 0:.2f}s total"]
+        if "first_audio" in self.marks:
+            lines[0] += f", first audio at {self.marks['first_audio']:.2f}s"
+        for span in self.to_dict()["spans"]:
+            line = f"{span['name']}: {span['duration'] * 1000:.0f} ms"
+            if span.get("time_to_first_token") is not None:
+                line += f" (first token {span['time_to_first_token'] * 1000:.0f} ms"
+                if span.get("tokens_per_second"):
+                    line += f", {span['tokens_per_second']:.1f} tok/s"
+                line += ")"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+def span(ctx, name, **attrs):
+    """Time a block under the trace attached to a RequestContext, if there is one"""
+    trace = getattr(ctx, "trace", None)
+    if trace is None:
+        return nullcontext(attrs)
+    return trace.span(name, **attrs)
+
+
+class Tracer:
+    """
+    Starts a Trace per interaction and, when it finishes, appends it to a rotating JSONL file
+    and folds its spans into per-stage histograms that can be exported in Prometheus text format.
+    """
+
+    def __init__(self, path=DEFAULT_TRACING_CONFIG["path"], max_bytes=DEFAULT_TRACING_CONFIG["max_bytes"],
+                 backups=DEFAULT_TRACING_CONFIG["backups"],
+                 prometheus_path=DEFAULT_TRACING_CONFIG["prometheus_path"],
+                 enabled=DEFAULT_TRACING_CONFIG["enabled"]):
+        self.enabled = enabled
+        self.prometheus_path = prometheus_path
+        self.last = None
+        self.callbacks = []
+        self.histograms = {}  # span name -> [bucket counts..., count, sum]
+        self.interactions = 0
+        self._lock = threading.Lock()
+
+        self.logger = None
+        if enabled and path:
+            self.logger = logging.getLogger(f"patriot_buddy.traces.{id(self)}")
+            self.logger.propagate = False
+            self.logger.setLevel(logging.INFO)
+            try:
+                handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                              encoding="utf-8", delay=True)
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                self.logger.addHandler(handler)
+            except Exception as e:
+                print(f"Error opening trace log: {e}")
+                self.logger = None
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a tracer from the "tracing" section of the app config"""
+        settings = dict(DEFAULT_TRACING_CONFIG)
+        settings.update(config.get("tracing", {}))
+        return cls(settings["path"], settings["max_bytes"], settings["backups"],
+                   settings["prometheus_path"], settings["enabled"])
+
+    def start(self, ctx, text=None, started=None):
+        """Attach a new Trace to the RequestContext ctx and return it"""
+        if not self.enabled:
+            return None
+        trace = Trace(ctx.id, text, started)
+        ctx.trace = trace
+        return trace
+
+    def finish(self, trace, **attrs):
+        """Close a trace, write it out and tell the callbacks"""
+        if trace is None or trace.duration is not None:
+            return
+        trace.duration = round(time.perf_counter() - trace.started, 4)
+        record = trace.to_dict()
+        record.update(attrs)
+
+        if self.logger is not None:
+            try:
+                self.logger.info(json.dumps(record))
+            except Exception as e:
+                print(f"Error writing trace: {e}")
+
+        with self._lock:
+            self.last = trace
+            self.interactions += 1
+            self._observe("total", trace.duration)
+            if "first_audio" in trace.marks:
+                self._observe("first_audio", trace.marks["first_audio"])
+            for name, seconds in trace.breakdown().items():
+                self._observe(name, seconds)
+            callbacks = list(self.callbacks)
+        if self.prometheus_path:
+            self.write_prometheus()
+
+        for callback in callbacks:
+            try:
+                callback(trace)
+            except Exception as e:
+                print(f"Error in trace callback: {e}")
+
+    def _observe(self, name, seconds):
+        histogram = self.histograms.setdefault(name, [0] * (len(BUCKETS) + 2) + [0.0])
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram[index] += 1
+        histogram[-3] += 1  # +Inf bucket
+        histogram[-2] += 1  # count
+        histogram[-1] += seconds
+
+    def prometheus_text(self):
+        """Per-stage latency histograms in the Prometheus text exposition format"""
+        lines = [
+            "# HELP patriot_buddy_interactions_total Interactions traced since startup.",
+            "# TYPE patriot_buddy_interactions_total counter",
+            f"patriot_buddy_interactions_total {self.interactions}",
+            "# HELP patriot_buddy_stage_seconds Time spent per stage of an interaction.",
+            "# TYPE patriot_buddy_stage_seconds histogram"
+        ]
+        with self._lock:
+            for name, histogram in sorted(self.histograms.items()):
+                for index, bound in enumerate(BUCKETS):
+                    lines.append(f'patriot_buddy_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {histogram[index]}')
+                lines.append(f'patriot_buddy_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {histogram[-3]}')
+                lines.append(f'patriot_buddy_stage_seconds_count{{stage="{name}"}} {histogram[-2]}')
+                lines.append(f'patriot_buddy_stage_seconds_sum{{stage="{name}"}} {histogram[-1]:.4f}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self):
+        """Write the metrics for node_exporter's textfile collector, replacing the file atomically"""
+        try:
+            temp_path = f"{self.prometheus_path}.tmp"
+            with open(temp_path, "w") as f:
+                f.write(self.prometheus_text())
+            os.replace(temp_path, self.prometheus_path)
+        except Exception as e:
+            print(f"Error writing Prometheus metrics: {e}")
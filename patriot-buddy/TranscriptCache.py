@@ -0,0 +1,108 @@
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TRANSCRIPT_CACHE_CONFIG = {
+    "enabled": True,
+    "max_entries": 512,
+    "ttl": 86400,
+    "persist_path": "patriot-buddy/transcript_cache.json"
+}
+
+FILLER_WORDS = {"um", "umm", "uh", "uhh", "er", "erm", "ah", "hmm", "hey", "please", "ok", "okay",
+                "so", "well", "just", "patriot", "buddy"}
+PUNCTUATION = re.compile(r"[^\w\s']")
+
+
+def normalize(text):
+    """Case, punctuation and filler words stripped, so repeated commands share one key"""
+    words = PUNCTUATION.sub(" ", text.lower()).split()
+    return " ".join(word for word in words if word not in FILLER_WORDS)
+
+
+class TranscriptCache:
+    """Bounded LRU cache from normalized transcript to classification result, with TTL"""
+
+    def __init__(self, max_entries=DEFAULT_TRANSCRIPT_CACHE_CONFIG["max_entries"],
+                 ttl=DEFAULT_TRANSCRIPT_CACHE_CONFIG["ttl"], persist_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist_path = persist_path
+        self.entries = OrderedDict()  # key -> (stored_at, value)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if persist_path:
+            self.load()
+            atexit.register(self.save)
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a cache from the "transcript_cache" section, or None when it is disabled"""
+        settings = dict(DEFAULT_TRANSCRIPT_CACHE_CONFIG)
+        settings.update(config.get("transcript_cache", {}))
+        if not settings["enabled"]:
+            return None
+        return cls(settings["max_entries"], settings["ttl"], settings["persist_path"])
+
+    def _key(self, namespace, text):
+        return f"{namespace}|{normalize(text)}"
+
+    def get(self, namespace, text):
+        """Return the cached result for a transcript, or None on a miss"""
+        key = self._key(namespace, text)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or (self.ttl and time.time() - entry[0] > self.ttl):
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, namespace, text, value):
+        key = self._key(namespace, text)
+        with self._lock:
+            self.entries[key] = (time.time(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    def load(self):
+        try:
+            if os.path.exists(self.persist_path):
+                with open(self.persist_path, 'r') as f:
+                    stored = json.load(f)
+                now = time.time()
+                with self._lock:
+                    for key, stored_at, value in stored[-self.max_entries:]:
+                        if not self.ttl or now - stored_at <= self.ttl:
+                            self.entries[key] = (stored_at, value)
+        except Exception as e:
+            print(f"Error loading transcript cache: {e}")
+
+    def save(self):
+        try:
+            with self._lock:
+                stored = [[key, stored_at, value] for key, (stored_at, value) in self.entries.items()]
+            with open(self.persist_path, 'w') as f:
+                json.dump(stored, f)
+        except Exception as e:
+            print(f"Error saving transcript cache: {e}")
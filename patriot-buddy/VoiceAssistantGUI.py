@@ -1,48 +1,45 @@
 from ListeningAnimation import ListeningAnimation
 from APIconfigDialog import ApiConfigDialog
-from Listener import Listener
 from Colors import *
 from modernFrame import ModernFrame
-from dotenv import load_dotenv
-from API_CONFIGS import DEFAULT_API_CONFIG
+import Startup
 import threading
-import random
-import json
-import os
 from PySide6.QtCore import Qt, Signal, Slot, QTimer
-from PySide6.QtGui import QPixmap
+from PySide6.QtGui import QPixmap, QKeySequence, QShortcut
 from PySide6.QtWidgets import (QMainWindow, QVBoxLayout, QHBoxLayout, QLabel,
                                QWidget, QPushButton)
-import requests
-import speech_recognition as sr
-from elevenlabs.client import ElevenLabs
-from elevenlabs import play, VoiceSettings
-
-CONFIG_FILE = "patriot-buddy/patriot_buddy_config.json"
 
 class VoiceAssistantGUI(QMainWindow):
     update_signal = Signal(str, str)  # (message, type)
 
-    load_dotenv(dotenv_path="patriot-buddy/env")
-
-    # Load API keys from environment variables
-    IFTTT_API_KEY = os.getenv("IFTTT_API_KEY")
-    ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
-    VOICE_ID = os.getenv("VOICE_ID")
-    EVENT_ON = "PLUGON"
-    EVENT_OFF = "PLUGOFF"
-
-    # Initialize ElevenLabs client
-    client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
-
     def __init__(self):
         super().__init__()
-        self.listener = Listener()
-        self.listener.text_received.connect(self.process_text)
+        self.core = None
         self.selected_mode = None
-        self.api_config = self.load_config()
         self.init_ui()
         self.update_signal.connect(self.update_ui)
+        # Paint the window first; the pipeline and its heavy imports load once the event loop runs
+        QTimer.singleShot(0, self.start_core)
+
+    def start_core(self):
+        Startup.mark("first_paint")
+        threading.Thread(target=self.load_core, name="core-startup", daemon=True).start()
+
+    def load_core(self):
+        """Build the AssistantCore on a background thread and hand it to the UI when it is ready"""
+        try:
+            from AssistantCore import AssistantCore
+            Startup.mark("core_imported")
+            core = AssistantCore()
+        except Exception as e:
+            print(f"Error starting Patriot Buddy: {e}")
+            self.update_signal.emit("Patriot Buddy could not start", "error")
+            return
+        core.selected_mode = self.selected_mode
+        # Core messages arrive on worker threads; the signal queues them onto the UI thread
+        core.messages.connect(self.update_signal.emit)
+        self.core = core
+        self.update_signal.emit("", "core_ready")
 
     def init_ui(self):
         # Set window properties
@@ -90,7 +87,29 @@ class VoiceAssistantGUI(QMainWindow):
         """)
         settings_button.clicked.connect(self.open_settings)
 
+        # Hands-free toggle for wake word listening
+        self.hands_free_button = QPushButton("Hands-free")
+        self.hands_free_button.setCheckable(True)
+        self.hands_free_button.setStyleSheet(f"""
+            QPushButton {{
+                background-color: transparent;
+                color: {PRIMARY_COLOR};
+                border: 1px solid {PRIMARY_COLOR};
+                border-radius: 4px;
+                padding: 6px 12px;
+            }}
+            QPushButton:hover {{
+                background-color: rgba(26, 127, 64, 0.1);
+            }}
+            QPushButton:checked {{
+                background-color: {PRIMARY_COLOR};
+                color: white;
+            }}
+        """)
+        self.hands_free_button.toggled.connect(self.toggle_hands_free)
+
         top_layout.addStretch()
+        top_layout.addWidget(self.hands_free_button)
         top_layout.addWidget(settings_button)
 
         main_layout.addWidget(top_bar)
@@ -245,6 +264,17 @@ class VoiceAssistantGUI(QMainWindow):
         response_container.setFixedHeight(200)  # Taller response box
         main_layout.addWidget(response_container)
 
+        # Developer overlay with the last interaction's latency breakdown (Ctrl+Shift+D)
+        self.trace_overlay = QLabel("No interactions traced yet")
+        self.trace_overlay.setStyleSheet(f"""
+            font-family: Menlo, Consolas, monospace;
+            font-size: 11px;
+            color: {LIGHT_TEXT_COLOR};
+        """)
+        self.trace_overlay.setVisible(False)
+        main_layout.addWidget(self.trace_overlay)
+        QShortcut(QKeySequence("Ctrl+Shift+D"), self, self.toggle_trace_overlay)
+
         # Highlight Normal mode button initially
         self.set_direct_mode(None)
 
@@ -275,38 +305,45 @@ class VoiceAssistantGUI(QMainWindow):
         self.status_label.setText(f"Mode set to {mode_text}. Click Patriot Buddy to speak.")
 
     def checkListener(self):
-        check = self.listener.toggle_listening()
+        if self.core is None:
+            self.status_label.setText("Still starting up, one moment...")
+            return
+        check = self.core.listener.toggle_listening()
 
         if check == "Listening":
+            # The user is about to speak, so stop any answer still generating or playing
+            self.core.cancel_current_request()
             self.startListeningChangeUI()
             #self.update_signal.emit(self.Listener.text_received)
         else:
             self.stopListeningChangeUI()
 
 
-    def open_settings(self):
-        dialog = ApiConfigDialog(self, self.api_config)
-        if dialog.exec():
-            self.api_config = self.load_config()
+    def toggle_hands_free(self, enabled):
+        if self.core is None or not self.core.listener.set_hands_free(enabled):
+            self.hands_free_button.setChecked(False)
+            self.update_ui("Wake word detection is not available", "error")
+        elif enabled:
+            self.status_label.setText("Say \"Patriot Buddy\" or click to speak")
 
-    def load_config(self):
-        try:
-            if os.path.exists(CONFIG_FILE):
-                with open(CONFIG_FILE, 'r') as f:
-                    return json.load(f)
-        except Exception as e:
-            print(f"Error loading config: {e}")
+    def toggle_trace_overlay(self):
+        self.trace_overlay.setVisible(not self.trace_overlay.isVisible())
 
-        return DEFAULT_API_CONFIG
-    
-    def process_text(self, text):
-        print("Processing Text :", text)
-        self.update_signal.emit(text, "user_input")
-        threading.Thread(target=self.process_command, args=(text,), daemon=True).start()
+    def closeEvent(self, event):
+        if self.core is not None:
+            self.core.close()
+        super().closeEvent(event)
+
+    def open_settings(self):
+        dialog = ApiConfigDialog(self, self.core.api_config if self.core is not None else None)
+        if dialog.exec() and self.core is not None:
+            self.core.reload_config()
 
     def set_direct_mode(self, mode):
         """Set the direct mode for the next interaction"""
         self.selected_mode = mode
+        if self.core is not None:
+            self.core.selected_mode = mode
 
         reset_style = f"""
             QPushButton {{
@@ -364,299 +401,28 @@ class VoiceAssistantGUI(QMainWindow):
 
         self.status_label.setText(f"Mode set to {mode_text}. Click Patriot Buddy to speak.")
 
-    def process_command(self, text):
-        """Process the user's command based on classification or direct mode"""
-        if self.selected_mode:
-            intent = self.selected_mode
-        else:
-            # Classify intent
-            intent = self.classify_intent(text)
-
-        # Route to appropriate handler
-        if intent == "HOME_AUTOMATION":
-            response = self.handle_home_automation(text)
-        elif intent == "EXTERNAL_API":
-            response = self.handle_external_api(text)
-        else:  # Default to conversation
-            response = self.handle_conversation(text)
-
-        # Update UI and speak response
-        self.update_signal.emit(response, "response")
-        self.speak(response)
-
-    def classify_intent(self, prompt):
-        """
-        Use Mistral AI to classify the user's intent
-        """
-        url = "http://localhost:11434/api/generate"
-        data = {
-            "model": "mistral",
-            "prompt": f"""You are an AI assistant that classifies user requests into specific categories. Classify the following request into one of these categories:
-
-            1. CONVERSATION - general chat, questions not requiring external data
-            2. HOME_AUTOMATION - controlling lights, thermostats, or other smart home devices
-            3. EXTERNAL_API - requests for weather, stocks, news, or other external data
-
-            For the following request, respond with ONLY 'CONVERSATION', 'HOME_AUTOMATION', or 'EXTERNAL_API':
-            "{prompt}"
-
-            Response:"""
-        }
-
-        try:
-            response = requests.post(url, json=data, stream=True)
-            full_response = ""
-            for line in response.iter_lines():
-                if line:
-                    json_response = json.loads(line)
-                    if 'response' in json_response:
-                        full_response += json_response['response']
-            return full_response.strip().upper()
-        except Exception as e:
-            print(f"Error connecting to Mistral for intent classification: {e}")
-            return "CONVERSATION"  # Default to conversation on error
-
-    def handle_conversation(self, prompt):
-        """
-        Use Mistral AI to generate a conversational response
-        """
-        url = "http://localhost:11434/api/generate"
-        data = {
-            "model": "mistral",
-            "prompt": f"""You are Patriot Buddy, a friendly and helpful assistant. You should keep your responses brief and to the point.
-
-            User: {prompt}
-            Patriot Buddy (in 50 words or less):"""
-        }
-
-        try:
-            response = requests.post(url, json=data, stream=True)
-            full_response = ""
-            for line in response.iter_lines():
-                if line:
-                    json_response = json.loads(line)
-                    if 'response' in json_response:
-                        full_response += json_response['response']
-            return full_response.strip()
-        except Exception as e:
-            print(f"Error connecting to Mistral for conversation: {e}")
-            return "I'm having trouble connecting to my thinking module. Can you try again?"
-
-    def handle_home_automation(self, prompt):
-        """
-        Handle home automation requests
-        """
-        url = "http://localhost:11434/api/generate"
-        data = {
-            "model": "mistral",
-            "prompt": f"""You are a home automation AI assistant. Based on the user's request, determine what device they want to control and the desired state.
-
-            Currently, you can only control lights (ON or OFF).
-
-            For the following request, respond with ONLY 'LIGHTS:ON', 'LIGHTS:OFF', or 'UNKNOWN':
-            "{prompt}"
-
-            Response:"""
-        }
-
-        try:
-            response = requests.post(url, json=data, stream=True)
-            full_response = ""
-            for line in response.iter_lines():
-                if line:
-                    json_response = json.loads(line)
-                    if 'response' in json_response:
-                        full_response += json_response['response']
-
-            device_action = full_response.strip().upper()
-
-            if device_action == "LIGHTS:ON":
-                if self.trigger_ifttt(EVENT_ON):
-                    return "I've turned the lights on for you."
-                else:
-                    return "I tried to turn the lights on, but there was an error."
-            elif device_action == "LIGHTS:OFF":
-                if self.trigger_ifttt(EVENT_OFF):
-                    return "I've turned the lights off for you."
-                else:
-                    return "I tried to turn the lights off, but there was an error."
-            else:
-                return "I can only control lights right now. You can ask me to turn them on or off."
-
-        except Exception as e:
-            print(f"Error in home automation: {e}")
-            return "I had trouble understanding your home automation request."
-
-    def handle_external_api(self, prompt):
-        """
-        Handle requests requiring external API calls
-        """
-        url = "http://localhost:11434/api/generate"
-        data = {
-            "model": "mistral",
-            "prompt": f"""You are an AI assistant that identifies what external data a user is requesting.
-
-            1. WEATHER - requesting weather information
-            2. STOCKS - requesting stock market information
-            3. OTHER - any other external data request
-
-            For the following request, respond with ONLY 'WEATHER', 'STOCKS', or 'OTHER':
-            "{prompt}"
-
-            Response:"""
-        }
-
-        try:
-            response = requests.post(url, json=data, stream=True)
-            data_type = ""
-            for line in response.iter_lines():
-                if line:
-                    json_response = json.loads(line)
-                    if 'response' in json_response:
-                        data_type += json_response['response']
-
-            data_type = data_type.strip().upper()
-
-            if data_type == "WEATHER":
-                return self.get_weather(prompt)
-            elif data_type == "STOCKS":
-                return self.get_stocks(prompt)
-            else:
-                return "I don't have access to that type of external data yet."
-
-        except Exception as e:
-            print(f"Error in external API handler: {e}")
-            return "I had trouble connecting to external data sources."
-
-    def get_weather(self, prompt):
-        """
-        Get weather information using the configured API
-        """
-        # Check if weather API is enabled
-        if not self.api_config["apis"]["weather"]["enabled"]:
-            return "Weather information is currently disabled. You can enable it in settings."
-
-        # Get API key and default location
-        api_key = self.api_config["apis"]["weather"]["key"]
-        default_location = self.api_config["apis"]["weather"]["default_location"]
-
-        # Extract location from prompt
-        url = "http://localhost:11434/api/generate"
-        data = {
-            "model": "mistral",
-            "prompt": f"""Extract the location from the following weather request. 
-            If no location is explicitly mentioned, respond with 'DEFAULT'.
-            Return ONLY the location name, nothing else.
-
-            Request: "{prompt}"
-
-            Location:"""
-        }
-
-        try:
-            response = requests.post(url, json=data, stream=True)
-            location = ""
-            for line in response.iter_lines():
-                if line:
-                    json_response = json.loads(line)
-                    if 'response' in json_response:
-                        location += json_response['response']
-
-            location = location.strip()
-            if location == "DEFAULT":
-                location = default_location
-
-            # Call OpenWeatherMap API
-            weather_url = f"https://api.openweathermap.org/data/2.5/weather?q={location}&appid={api_key}&units=imperial"
-
-            weather_response = requests.get(weather_url)
-            if weather_response.status_code == 200:
-                weather_data = weather_response.json()
-                temp = weather_data["main"]["temp"]
-                condition = weather_data["weather"][0]["description"]
-                city = weather_data["name"]
-                country = weather_data["sys"]["country"]
-
-                return f"It's currently {condition} and {temp}°F in {city}, {country}."
-            else:
-                # Fallback to mock weather if API call fails
-                conditions = ["sunny", "partly cloudy", "overcast", "rainy", "clear"]
-                temp = random.randint(65, 85)
-                condition = random.choice(conditions)
-
-                return f"Could not get real weather data. Simulated forecast: {condition} and {temp}°F in {location}."
-
-        except Exception as e:
-            print(f"Error getting weather: {e}")
-            return "I had trouble getting the weather information."
-
-    def get_stocks(self, prompt):
-        """
-        Get stock information using the configured API
-        """
-        # Check if stocks API is enabled
-        if not self.api_config["apis"]["stocks"]["enabled"]:
-            return "Stock information is currently disabled. You can enable it in settings."
-
-        # Extract stock symbol
-        url = "http://localhost:11434/api/generate"
-        data = {
-            "model": "mistral",
-            "prompt": f"""Extract the stock symbol or company name from the following stock request.
-            Return ONLY the stock symbol or company name, nothing else.
-
-            Request: "{prompt}"
-
-            Stock:"""
-        }
-
-        try:
-            response = requests.post(url, json=data, stream=True)
-            stock = ""
-            for line in response.iter_lines():
-                if line:
-                    json_response = json.loads(line)
-                    if 'response' in json_response:
-                        stock += json_response['response']
-
-            stock = stock.strip()
-
-            # Mock stock data (would normally call an actual API)
-            price = round(random.uniform(50, 500), 2)
-            change = round(random.uniform(-3, 5), 2)
-            change_percent = round(change / price * 100, 2)
-
-            direction = "up" if change > 0 else "down"
-
-            return f"{stock} is trading at ${price}, {direction} {abs(change_percent)}%. Trading volume is moderate today."
-
-        except Exception as e:
-            print(f"Error getting stock information: {e}")
-            return "I had trouble getting the stock information."
-
-    def trigger_ifttt(self, event_name):
-        """
-        Trigger an IFTTT event
-        """
-        webhook_url = f"https://maker.ifttt.com/trigger/{event_name}/with/key/{IFTTT_API_KEY}"
-        try:
-            response = requests.post(webhook_url)
-            return response.status_code == 200
-        except Exception as e:
-            print(f"IFTTT Error: {e}")
-            return False
-
     @Slot(str, str)
     def update_ui(self, message, message_type):
-        if message_type == "user_input":
+        if message_type in ("user_input", "partial_input"):
             self.user_input.setText(message)
         elif message_type == "response":
             self.response_display.setText(message)
         elif message_type == "error":
             self.status_label.setText(message)
             QTimer.singleShot(2000, lambda: self.status_label.setText("Click Patriot Buddy to speak"))
+        elif message_type == "core_ready":
+            Startup.mark("core_ready")
+            self.trace_overlay.setVisible(self.core.api_config.get("tracing", {}).get("overlay", False))
+            if self.core.listener.hands_free:
+                self.hands_free_button.setChecked(True)
+            if Startup.report_requested:
+                # The import breakdown runs a fresh interpreter, so keep it off the UI thread
+                threading.Thread(target=lambda: print(Startup.report()), daemon=True).start()
+        elif message_type == "trace":
+            self.trace_overlay.setText(message)
+        elif message_type == "wake":
+            self.startListeningChangeUI()
         elif message_type == "stop_listening":
-            self.Listener.stop_listening()
             self.animation_widget.stop_animation()
             self.animation_widget.setVisible(False)  # Hide animation
             self.logo_label.setVisible(True)  # Show logo again
@@ -673,24 +439,3 @@ class VoiceAssistantGUI(QMainWindow):
                 mode_text = "Normal"
 
             self.status_label.setText(f"Mode set to {mode_text}. Click Patriot Buddy to speak.")
-
-    def speak(self, text):
-        # Use a thread to avoid blocking the UI
-        threading.Thread(target=self._speak_thread, args=(text,), daemon=True).start()
-
-    def _speak_thread(self, text):
-        try:
-            audio = self.client.text_to_speech.convert(
-                text=text,
-                voice_id=self.VOICE_ID,
-                model_id="eleven_multilingual_v2",
-                output_format="mp3_44100_128",
-                voice_settings=VoiceSettings(
-                    stability=0.5,
-                    similarity_boost=0.75
-                )
-            )
-            play(audio)
-        except Exception as e:
-            print(f"Text-to-speech error: {e}")
-
@@ -0,0 +1,157 @@
+import argparse
+import time
+import wave
+from AudioCapture import Endpointer, rms
+
+DEFAULT_WAKE_WORD_CONFIG = {
+    "enabled": False,
+    "phrase": "patriot buddy",
+    "sensitivity": 0.5,
+    "cpu_budget": 0.15,
+    "gate_ratio": 1.5,
+    "min_energy": 100,
+    "hangover": 0.6
+}
+
+
+def kws_threshold(sensitivity):
+    """Map sensitivity 0..1 onto pocketsphinx's keyword threshold (1e-5 strict .. 1e-40 eager)"""
+    sensitivity = min(max(sensitivity, 0.0), 1.0)
+    return 10 ** -(5 + sensitivity * 35)
+
+
+class WakeWordDetector:
+    """
+    Offline keyword spotter for the wake phrase. Only frames that pass a cheap energy gate are
+    decoded, and decoding is skipped whenever its CPU use would exceed cpu_budget seconds per
+    second of audio, so it can run around the clock on a low-power box.
+    """
+
+    def __init__(self, frame_duration, sample_rate=16000, sample_width=2,
+                 phrase=DEFAULT_WAKE_WORD_CONFIG["phrase"],
+                 sensitivity=DEFAULT_WAKE_WORD_CONFIG["sensitivity"],
+                 cpu_budget=DEFAULT_WAKE_WORD_CONFIG["cpu_budget"],
+                 gate_ratio=DEFAULT_WAKE_WORD_CONFIG["gate_ratio"],
+                 min_energy=DEFAULT_WAKE_WORD_CONFIG["min_energy"],
+                 hangover=DEFAULT_WAKE_WORD_CONFIG["hangover"]):
+        try:
+            from pocketsphinx import Decoder  # Only loaded once hands-free mode is turned on
+        except ImportError:
+            raise RuntimeError("Wake word detection needs PocketSphinx: pip install pocketsphinx")
+
+        self.frame_duration = frame_duration
+        self.sample_width = sample_width
+        self.cpu_budget = cpu_budget
+        self.gate_ratio = gate_ratio
+        self.min_energy = min_energy
+        self.hangover_frames = int(hangover / frame_duration)
+        self.decoder = Decoder(keyphrase=phrase.lower(), kws_threshold=kws_threshold(sensitivity),
+                               samprate=sample_rate, loglevel="FATAL")
+
+        # CPU and audio time accumulated over a ~10 second decaying window
+        self.decay = 1 - frame_duration / 10
+        self.cpu_window = 0.0
+        self.audio_window = 0.0
+        self.in_utterance = False
+        self.quiet_frames = 0
+
+        self.frames_seen = 0
+        self.frames_decoded = 0
+        self.frames_skipped = 0
+        self.cpu_seconds = 0.0
+
+    def process(self, frame, noise_floor):
+        """Feed one frame; returns True when the wake phrase has just been spoken"""
+        self.frames_seen += 1
+        self.audio_window = self.audio_window * self.decay + self.frame_duration
+        self.cpu_window *= self.decay
+
+        energy = rms(frame, self.sample_width)
+        if energy > max(self.min_energy, (noise_floor or 0) * self.gate_ratio):
+            self.quiet_frames = 0
+        else:
+            self.quiet_frames += 1
+            if not self.in_utterance or self.quiet_frames > self.hangover_frames:
+                self._end_utterance()
+                return False
+
+        if self.cpu_window > self.cpu_budget * self.audio_window:
+            self.frames_skipped += 1
+            return False
+
+        started = time.thread_time()
+        if not self.in_utterance:
+            self.decoder.start_utt()
+            self.in_utterance = True
+        self.decoder.process_raw(frame, False, False)
+        detected = self.decoder.hyp() is not None
+        if detected:
+            self._end_utterance()
+        cost = time.thread_time() - started
+
+        self.cpu_window += cost
+        self.cpu_seconds += cost
+        self.frames_decoded += 1
+        return detected
+
+    def _end_utterance(self):
+        if self.in_utterance:
+            self.decoder.end_utt()
+            self.in_utterance = False
+
+    def stats(self):
+        audio_seconds = self.frames_seen * self.frame_duration
+        return {
+            "audio_seconds": audio_seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "cpu_per_audio_second": self.cpu_seconds / audio_seconds if audio_seconds else 0.0,
+            "frames_decoded": self.frames_decoded,
+            "frames_skipped": self.frames_skipped,
+            "frames_seen": self.frames_seen
+        }
+
+
+def benchmark(path, sensitivity, cpu_budget, chunk=480):
+    """Run a 16-bit mono WAV file through the detector and report CPU use per second of audio"""
+    with wave.open(path, 'rb') as wav:
+        sample_rate = wav.getframerate()
+        sample_width = wav.getsampwidth()
+        if wav.getnchannels() != 1:
+            raise ValueError("The benchmark expects a mono recording")
+        audio = wav.readframes(wav.getnframes())
+
+    frame_duration = chunk / sample_rate
+    frame_bytes = chunk * sample_width
+    noise = Endpointer(frame_duration, sample_width)
+    detector = WakeWordDetector(frame_duration, sample_rate, sample_width,
+                                sensitivity=sensitivity, cpu_budget=cpu_budget)
+
+    detections = []
+    started = time.process_time()
+    for index in range(0, len(audio) - frame_bytes + 1, frame_bytes):
+        frame = audio[index:index + frame_bytes]
+        noise.process(index // frame_bytes, frame)
+        if detector.process(frame, noise.noise_floor):
+            detections.append(round(index / frame_bytes * frame_duration, 2))
+    total_cpu = time.process_time() - started
+
+    results = detector.stats()
+    results["total_cpu_per_audio_second"] = total_cpu / results["audio_seconds"] if results["audio_seconds"] else 0.0
+    results["detections_at_seconds"] = detections
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the wake word detector on a recording")
+    parser.add_argument("command", choices=["bench"])
+    parser.add_argument("wav", help="16-bit mono WAV, ideally 16 kHz")
+    parser.add_argument("--sensitivity", type=float, default=DEFAULT_WAKE_WORD_CONFIG["sensitivity"])
+    parser.add_argument("--cpu-budget", type=float, default=DEFAULT_WAKE_WORD_CONFIG["cpu_budget"])
+    args = parser.parse_args()
+
+    for key, value in benchmark(args.wav, args.sensitivity, args.cpu_budget).items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import threading
+import time
+import requests
+from Executor import StageBusy
+
+OPENWEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+
+
+class _Flight:
+    """A lookup in progress that concurrent callers for the same location wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class WeatherService:
+    """
+    OpenWeatherMap lookups with a per-location TTL cache. Stale entries are answered
+    immediately and refreshed in the background; concurrent lookups share one request.
+    """
+
+    def __init__(self, api_key, ttl=600, max_stale=3600, url=OPENWEATHER_URL, timeout=5, executor=None):
+        self.api_key = api_key
+        self.executor = executor
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+        self.cache = {}  # location key -> (fetched_at, weather)
+        self.in_flight = {}  # location key -> _Flight
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, executor=None):
+        """Build the service from the "weather" API entry"""
+        weather_config = config["apis"]["weather"]
+        return cls(weather_config["key"],
+                   ttl=weather_config.get("cache_ttl", 600),
+                   max_stale=weather_config.get("max_stale", 3600),
+                   url=weather_config.get("url", OPENWEATHER_URL),
+                   executor=executor)
+
+    def get(self, location):
+        """
+        Return {"temp", "condition", "city", "country"} for a location,
+        or None if OpenWeatherMap could not answer
+        """
+        key = location.strip().lower()
+        with self._lock:
+            entry = self.cache.get(key)
+        if entry is not None:
+            age = time.time() - entry[0]
+            if age < self.ttl:
+                return entry[1]
+            if age < self.max_stale:
+                self.refresh(location)
+                return entry[1]
+        return self._fetch_shared(key, location)
+
+    def refresh(self, location):
+        """Fetch a location in the background unless a fetch is already running"""
+        key = location.strip().lower()
+        with self._lock:
+            if key in self.in_flight:
+                return
+        if self.executor is None:
+            threading.Thread(target=self._refresh, args=(key, location), daemon=True).start()
+            return
+        try:
+            self.executor.submit("background", self._refresh, key, location)
+        except StageBusy:
+            pass  # A refresh will be tried again on the next stale read
+
+    def age(self, location):
+        """Seconds since the location was fetched, or None if it is not cached"""
+        with self._lock:
+            entry = self.cache.get(location.strip().lower())
+        return None if entry is None else time.time() - entry[0]
+
+    def _refresh(self, key, location):
+        try:
+            self._fetch_shared(key, location)
+        except Exception as e:
+            print(f"Error refreshing weather for {location}: {e}")
+
+    def _fetch_shared(self, key, location):
+        with self._lock:
+            flight = self.in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self.in_flight[key] = flight
+
+        if leader:
+            try:
+                flight.result = self._fetch(location)
+                if flight.result is not None:
+                    with self._lock:
+                        self.cache[key] = (time.time(), flight.result)
+            except Exception as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    del self.in_flight[key]
+                flight.done.set()
+        else:
+            flight.done.wait(self.timeout * 2)
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def _fetch(self, location):
+        params = {"q": location, "appid": self.api_key, "units": "imperial"}
+        response = self.session.get(self.url, params=params, timeout=self.timeout)
+        if response.status_code != 200:
+            return None
+        weather_data = response.json()
+        return {
+            "temp": weather_data["main"]["temp"],
+            "condition": weather_data["weather"][0]["description"],
+            "city": weather_data["name"],
+            "country": weather_data["sys"]["country"]
+        }
@@ -0,0 +1,432 @@
+"""
+End-to-end benchmark of the command pipeline against local stand-ins for every remote service.
+
+    python patriot-buddy/benchmark.py run --runs 3 --token-rate 40
+    python patriot-buddy/benchmark.py run --wav recordings/*.wav --stt sphinx
+    python patriot-buddy/benchmark.py run --devices 20 --mqtt
+    python patriot-buddy/benchmark.py compare benchmark-old.json benchmark-new.json
+
+Per-stage timings come from the interaction traces; results are saved as JSON so runs from
+different commits can be compared.
+"""
+import argparse
+import array
+import copy
+import json
+import math
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+import time
+import wave
+from API_CONFIGS import DEFAULT_API_CONFIG
+from FakeServices import FakeServices, FakeMqttBroker, DEFAULT_FAKE_CONFIG
+from RequestContext import RequestContext
+
+CORPUS_FILE = "patriot-buddy/benchmark_corpus.txt"
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize(samples):
+    """Turn {stage: [seconds, ...]} into count, mean and percentiles per stage"""
+    stages = {}
+    for name, values in sorted(samples.items()):
+        stats = {"count": len(values), "mean": round(sum(values) / len(values), 4)}
+        for pct in PERCENTILES:
+            stats[f"p{pct}"] = round(percentile(values, pct), 4)
+        stages[name] = stats
+    return stages
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return "local"
+
+
+def build_config(services, args, workdir, broker=None):
+    """The app config with every remote endpoint pointed at the stand-ins and nothing persisted"""
+    config = copy.deepcopy(DEFAULT_API_CONFIG)
+    config["ollama"]["url"] = services.url
+    config["apis"]["weather"]["url"] = f"{services.url}/data/2.5/weather"
+    config["apis"]["weather"]["key"] = "benchmark"
+    config["apis"]["stocks"]["url"] = f"{services.url}/query"
+    config["apis"]["stocks"]["key"] = "benchmark"
+    config["apis"]["stocks"]["requests_per_minute"] = 600
+    config["listener"]["microphone"] = False
+    config["wake_word"]["enabled"] = False
+    config["stt"]["backend"] = args.stt
+    config["prefetch"]["enabled"] = False
+    config["prefetch"]["profile_path"] = ""
+    config["intent_classifier"]["log_path"] = ""
+    config["transcript_cache"]["enabled"] = args.warm
+    config["transcript_cache"]["persist_path"] = None
+    config["tts_cache"]["enabled"] = args.warm
+    config["tts_cache"]["directory"] = os.path.join(workdir, "tts_cache")
+    config["tts_cache"]["prewarm"] = False
+    config["tracing"]["path"] = ""
+    config["tracing"]["prometheus_path"] = ""
+    config["devices"]["ifttt_url"] = services.url
+    config["speculation"]["enabled"] = args.speculate
+    if args.devices:
+        # A group of LAN relays or MQTT devices, to measure commands that fan out to many devices
+        def relay(index):
+            if broker is not None:
+                return {"driver": "mqtt", "topic": f"home/light{index}/set"}
+            return {"driver": "http", "url": f"{services.url}/devices/light{index}"}
+
+        if broker is not None:
+            config["devices"]["mqtt"] = {"host": "127.0.0.1", "port": broker.port}
+        config["devices"]["devices"] = {
+            f"light{index}": dict(relay(index), name=f"light {index}", groups=["lights"])
+            for index in range(1, args.devices + 1)
+        }
+    return config
+
+
+def simulated_player(bytes_per_second):
+    """Stand-in for ffplay that takes as long as the clip would to play, and stops on cancel"""
+    def player(audio, ctx=None):
+        if bytes_per_second <= 0:
+            return
+        stopped = threading.Event()
+        unregister = ctx.on_cancel(stopped.set) if ctx is not None else None
+        stopped.wait(len(audio) / bytes_per_second)
+        if unregister is not None:
+            unregister()
+    return player
+
+
+def create_assistant(services, config, player):
+    """Build the real assistant core with its remote clients redirected to the stand-ins"""
+    from elevenlabs.client import ElevenLabs
+    from SpeechPipeline import SpeechPipeline
+    from AssistantCore import AssistantCore
+
+    class BenchmarkAssistant(AssistantCore):
+        client = ElevenLabs(api_key="benchmark", base_url=services.url)
+        VOICE_ID = "benchmark"
+        IFTTT_API_KEY = "benchmark"
+
+        def create_speech_pipeline(self, ctx=None):
+            return SpeechPipeline(self.client, self.VOICE_ID, self.api_config.get("tts"), self.audio_cache,
+                                  self.executor, ctx, player=player)
+
+    return BenchmarkAssistant(config)
+
+
+class Benchmark:
+    """Drives interactions through the assistant and collects their traces"""
+
+    def __init__(self, assistant, timeout=60):
+        self.assistant = assistant
+        self.timeout = timeout
+        self.traces = []
+        self.errors = 0
+        self.waiting = {}  # request id -> Event set when the trace finishes
+        self._lock = threading.Lock()
+        assistant.tracer.callbacks.append(self.on_trace)
+
+    def on_trace(self, trace):
+        with self._lock:
+            self.traces.append(trace)
+            done = self.waiting.pop(trace.request_id, None)
+        if done is not None:
+            done.set()
+
+    def interact(self, text, session="local"):
+        """Run one transcript through process_command and wait until its audio has played"""
+        ctx = RequestContext(session)
+        done = threading.Event()
+        with self._lock:
+            self.waiting[ctx.id] = done
+        self.assistant.start_trace(ctx, text)
+        try:
+            self.assistant.process_command(text, ctx)
+        except Exception as e:
+            print(f"Error running \"{text}\": {e}")
+        if not done.wait(self.timeout):
+            with self._lock:
+                self.errors += 1
+                self.waiting.pop(ctx.id, None)
+            ctx.cancel()
+
+    def run_texts(self, texts, concurrency=1):
+        """Run every transcript, concurrency interactions at a time"""
+        pending = queue.Queue()
+        for text in texts:
+            pending.put(text)
+
+        def worker(session):
+            while True:
+                try:
+                    text = pending.get_nowait()
+                except queue.Empty:
+                    return
+                self.interact(text, session)
+
+        # Each worker is a separate talker, as the Ollama scheduler queues sessions fairly
+        workers = [threading.Thread(target=worker, args=(f"session-{index}",), daemon=True)
+                   for index in range(concurrency)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+    def run_wav(self, path, realtime=False):
+        """Replay a recording through the Listener, then run whatever it transcribed"""
+        listener = self.assistant.listener
+        capture = listener.capture
+        frames = read_frames(path, capture.sample_rate, capture.chunk)
+        silence = b"\0" * (capture.chunk * capture.sample_width)
+        # Enough silence afterwards for the endpointer to notice the speaker has stopped
+        frames += [silence] * int((listener.settings["end_silence"] + 0.5) / capture.frame_duration)
+
+        results = queue.Queue()
+
+        def on_message(message, message_type):
+            if message_type in ("user_input", "error"):
+                results.put((message, message_type))
+
+        # The transcript is run by interact() below rather than by the core's own handler
+        listener.text_received.disconnect(self.assistant.on_listener_message)
+        listener.text_received.connect(on_message)
+        try:
+            listener.start_listening()
+            started = time.perf_counter()
+            for index, frame in enumerate(frames):
+                if realtime:
+                    delay = started + index * capture.frame_duration - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                capture.push(frame)
+            message, message_type = results.get(timeout=self.timeout)
+        except queue.Empty:
+            message, message_type = "timed out", "error"
+        finally:
+            listener.text_received.disconnect(on_message)
+            listener.text_received.connect(self.assistant.on_listener_message)
+
+        if message_type != "user_input":
+            print(f"{path}: {message}")
+            self.errors += 1
+            return
+        self.interact(message)
+
+    def samples(self):
+        """Seconds per stage across every finished trace"""
+        samples = {}
+        for trace in self.traces:
+            stages = trace.breakdown()
+            stages["total"] = trace.duration
+            if "first_audio" in trace.marks:
+                stages["first_audio"] = trace.marks["first_audio"]
+            for name, seconds in stages.items():
+                samples.setdefault(name, []).append(seconds)
+        return samples
+
+
+def pcm16(audio, sample_width):
+    """Samples of a WAV file's frames as signed 16-bit values; 8-bit WAV data is unsigned"""
+    if sample_width == 1:
+        return array.array("h", ((byte - 128) << 8 for byte in audio))
+    if sample_width == 2:
+        samples = array.array("h")
+        samples.frombytes(audio)
+        return samples
+    if sample_width in (3, 4):
+        # Keep the two most significant bytes of each little-endian sample
+        return array.array("h", (int.from_bytes(audio[i + sample_width - 2:i + sample_width], "little", signed=True)
+                                 for i in range(0, len(audio) - sample_width + 1, sample_width)))
+    raise ValueError(f"unsupported sample width: {sample_width}")
+
+
+def resample(samples, from_rate, to_rate):
+    """Linear interpolation between neighbouring samples; enough for feeding the endpointer and STT"""
+    count = int(len(samples) * to_rate / from_rate)
+    step = from_rate / to_rate
+    last = len(samples) - 1
+    resampled = array.array("h")
+    for index in range(count):
+        position = index * step
+        left = int(position)
+        right = min(left + 1, last)
+        fraction = position - left
+        resampled.append(int(samples[left] + (samples[right] - samples[left]) * fraction))
+    return resampled
+
+
+def read_frames(path, sample_rate, chunk):
+    """Read a WAV file as 16-bit mono frames at the listener's sample rate"""
+    with wave.open(path, "rb") as wav:
+        samples = pcm16(wav.readframes(wav.getnframes()), wav.getsampwidth())
+        if wav.getnchannels() == 2:
+            samples = array.array("h", ((left + right) // 2 for left, right in zip(samples[::2], samples[1::2])))
+        elif wav.getnchannels() != 1:
+            raise ValueError(f"{path}: only mono and stereo recordings are supported")
+        if wav.getframerate() != sample_rate:
+            samples = resample(samples, wav.getframerate(), sample_rate)
+    audio = samples.tobytes()
+    frame_bytes = chunk * 2
+    return [audio[i:i + frame_bytes] for i in range(0, len(audio) - frame_bytes + 1, frame_bytes)]
+
+
+def run(args):
+    with open(args.corpus) as f:
+        texts = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    fake_settings = {
+        "token_rate": args.token_rate,
+        "first_token_delay": args.first_token_delay,
+        "tts_first_byte_delay": args.tts_delay,
+        "api_delay": args.api_delay
+    }
+    services = FakeServices(fake_settings).start()
+    broker = FakeMqttBroker(args.api_delay).start() if args.mqtt else None
+    workdir = tempfile.mkdtemp(prefix="patriot-buddy-bench-")
+    config = build_config(services, args, workdir, broker)
+    assistant = create_assistant(services, config, simulated_player(args.playback_rate))
+    benchmark = Benchmark(assistant, args.timeout)
+
+    try:
+        if args.warmup:
+            benchmark.run_texts(texts[:args.warmup])
+            benchmark.traces = []
+
+        started = time.perf_counter()
+        for _ in range(args.runs):
+            benchmark.run_texts(texts, args.concurrency)
+            for path in args.wav:
+                benchmark.run_wav(path, args.realtime)
+        wall_seconds = time.perf_counter() - started
+    finally:
+        assistant.close()
+        services.stop()
+        if broker is not None:
+            broker.stop()
+
+    results = {
+        "commit": current_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {
+            "runs": args.runs,
+            "concurrency": args.concurrency,
+            "warm": args.warm,
+            "stt": args.stt,
+            "devices": args.devices,
+            "mqtt": args.mqtt,
+            "speculate": args.speculate,
+            "corpus": args.corpus,
+            "wav": args.wav,
+            "playback_rate": args.playback_rate,
+            "fake_services": dict(DEFAULT_FAKE_CONFIG, **fake_settings)
+        },
+        "interactions": len(benchmark.traces),
+        "errors": benchmark.errors,
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput": round(len(benchmark.traces) / wall_seconds, 3) if wall_seconds else 0.0,
+        "service_requests": dict(services.requests, **({"mqtt": len(broker.messages)} if broker else {})),
+        "ollama_scheduler": assistant.ollama.scheduler.stats(),
+        "speculation": assistant.speculator.stats() if assistant.speculator is not None else {},
+        "stages": summarize(benchmark.samples())
+    }
+
+    output = args.output or f"patriot-buddy/benchmark-{results['commit']}.json"
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print_results(results)
+    print(f"Saved results to {output}")
+
+
+def print_results(results):
+    print(f"{results['interactions']} interactions, {results['errors']} errors, "
+          f"{results['throughput']} interactions/s")
+    print(f"{'stage':<18}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in results["stages"].items():
+        print(f"{name:<18}{stats['count']:>7}{stats['p50'] * 1000:>10.1f}"
+              f"{stats['p95'] * 1000:>10.1f}{stats['p99'] * 1000:>10.1f}")
+
+
+def compare(args):
+    """Show per-stage percentile changes between two saved runs"""
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"{baseline['commit']} -> {candidate['commit']}")
+    print(f"throughput: {baseline['throughput']} -> {candidate['throughput']} interactions/s")
+    regressions = 0
+    for name in sorted(set(baseline["stages"]) | set(candidate["stages"])):
+        old = baseline["stages"].get(name)
+        new = candidate["stages"].get(name)
+        if old is None or new is None:
+            print(f"{name:<18}{'only in ' + (baseline if new is None else candidate)['commit']}")
+            continue
+        cells = []
+        for pct in PERCENTILES:
+            key = f"p{pct}"
+            change = (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            if change > args.threshold:
+                regressions += 1
+            cells.append(f"{key} {old[key] * 1000:.1f} -> {new[key] * 1000:.1f} ms ({change:+.0f}%)")
+        print(f"{name:<18}" + "   ".join(cells))
+    if regressions:
+        print(f"{regressions} percentiles regressed by more than {args.threshold}%")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Patriot Buddy pipeline offline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the corpus and save per-stage latencies")
+    run_parser.add_argument("--corpus", default=CORPUS_FILE, help="One transcript per line")
+    run_parser.add_argument("--wav", nargs="*", default=[], help="Recordings to replay through the Listener")
+    run_parser.add_argument("--stt", default="sphinx", help="Speech-to-text backend for --wav")
+    run_parser.add_argument("--realtime", action="store_true", help="Replay recordings at real-time pace")
+    run_parser.add_argument("--runs", type=int, default=1)
+    run_parser.add_argument("--warmup", type=int, default=3, help="Interactions to run before measuring")
+    run_parser.add_argument("--concurrency", type=int, default=1)
+    run_parser.add_argument("--warm", action="store_true", help="Keep the transcript and TTS caches enabled")
+    run_parser.add_argument("--token-rate", type=float, default=DEFAULT_FAKE_CONFIG["token_rate"])
+    run_parser.add_argument("--first-token-delay", type=float, default=DEFAULT_FAKE_CONFIG["first_token_delay"])
+    run_parser.add_argument("--tts-delay", type=float, default=DEFAULT_FAKE_CONFIG["tts_first_byte_delay"])
+    run_parser.add_argument("--api-delay", type=float, default=DEFAULT_FAKE_CONFIG["api_delay"])
+    run_parser.add_argument("--playback-rate", type=float, default=16000,
+                            help="Audio bytes played per second (0 skips playback)")
+    run_parser.add_argument("--speculate", action="store_true",
+                            help="Start likely handlers while the intent is being classified")
+    run_parser.add_argument("--devices", type=int, default=0,
+                            help="Replace the lights with this many local HTTP relays")
+    run_parser.add_argument("--mqtt", action="store_true",
+                            help="Make the --devices relays MQTT devices behind a local stand-in broker")
+    run_parser.add_argument("--timeout", type=float, default=60)
+    run_parser.add_argument("--output", help="Results file (default patriot-buddy/benchmark-<commit>.json)")
+
+    compare_parser = commands.add_parser("compare", help="Compare two saved runs")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=10,
+                                help="Percent slowdown reported as a regression")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        raise SystemExit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
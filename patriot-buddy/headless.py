@@ -0,0 +1,85 @@
+import argparse
+import copy
+import signal
+import sys
+import threading
+from AssistantCore import AssistantCore
+from RequestContext import RequestContext
+import Startup
+
+
+def print_message(message, message_type, traces=False):
+    """Log the core's status updates to stdout"""
+    if message_type == "user_input":
+        print(f"You: {message}", flush=True)
+    elif message_type == "response":
+        print(f"Patriot Buddy: {message}", flush=True)
+    elif message_type == "error":
+        print(f"Error: {message}", flush=True)
+    elif message_type == "wake":
+        print("Wake word heard, listening...", flush=True)
+    elif message_type == "trace" and traces:
+        print(message, flush=True)
+
+
+def run_once(core, text):
+    """Handle one command and wait until the answer has been spoken"""
+    ctx = RequestContext()
+    core.current_request = ctx
+    core.start_trace(ctx, text)
+    speech = core.process_command(text, ctx)
+    if speech is not None:
+        speech.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Patriot Buddy without the GUI")
+    parser.add_argument("--say", metavar="TEXT", help="Handle one command and exit")
+    parser.add_argument("--stdin", action="store_true",
+                        help="Read commands from standard input instead of the microphone")
+    parser.add_argument("--mode", choices=["CONVERSATION", "HOME_AUTOMATION", "EXTERNAL_API"],
+                        help="Skip intent classification and always use this handler")
+    parser.add_argument("--traces", action="store_true", help="Print each interaction's latency breakdown")
+    args = parser.parse_args()
+
+    config = copy.deepcopy(AssistantCore.load_config())
+    # Only the final response is printed, not every partial repaint of a streamed one
+    config.setdefault("ui", {})["stream_responses"] = False
+    if args.say is not None or args.stdin:
+        config.setdefault("listener", {})["microphone"] = False
+
+    core = AssistantCore(config)
+    Startup.mark("core_ready")
+    if Startup.report_requested:
+        print(Startup.report(["AssistantCore"]), flush=True)
+    core.selected_mode = args.mode
+    core.messages.connect(lambda message, message_type: print_message(message, message_type, args.traces))
+
+    try:
+        if args.say is not None:
+            run_once(core, args.say)
+            return 0
+
+        if args.stdin:
+            for line in sys.stdin:
+                if line.strip():
+                    run_once(core, line.strip())
+            return 0
+
+        # Daemon: the wake word arms the listener, and transcripts run through the core
+        if not core.listener.set_hands_free(True):
+            print("Wake word detection is not available; use --stdin or --say instead", file=sys.stderr)
+            return 1
+        stopped = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stopped.set())
+        signal.signal(signal.SIGINT, lambda *args: stopped.set())
+        print(f"Say \"{core.listener.wake_word_settings['phrase']}\" to talk to Patriot Buddy", flush=True)
+        while not stopped.wait(1):
+            pass
+        return 0
+    finally:
+        core.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,24 @@
+import Startup
 import sys
-from VoiceAssistantGUI import VoiceAssistantGUI
-from PySide6.QtWidgets import (QApplication)
 
 
 if __name__ == "__main__":
+    if "--startup-report" in sys.argv[1:]:
+        sys.argv.remove("--startup-report")
+        Startup.report_requested = True
+
+    if "--headless" in sys.argv[1:]:
+        # Headless nodes never import Qt
+        sys.argv.remove("--headless")
+        import headless
+        sys.exit(headless.main())
+
+    from PySide6.QtWidgets import QApplication
+    from VoiceAssistantGUI import VoiceAssistantGUI
+    Startup.mark("gui_imported")
+
     app = QApplication(sys.argv)
     window = VoiceAssistantGUI()
     window.show()
+    Startup.mark("window_shown")
     sys.exit(app.exec())
@@ -0,0 +1,74 @@
+import array
+import math
+import speech_recognition as sr
+from AudioCapture import Endpointer, rms
+from Listener import Listener
+
+CHUNK = 480
+SAMPLE_RATE = 16000
+FRAME_DURATION = CHUNK / SAMPLE_RATE
+
+
+def frame(amplitude):
+    """One frame of a 400 Hz tone at the given peak amplitude"""
+    return array.array("h", (int(amplitude * math.sin(2 * math.pi * 400 * i / SAMPLE_RATE))
+                             for i in range(CHUNK))).tobytes()
+
+
+def test_rms_of_16_bit_frames():
+    assert rms(b"") == 0
+    assert rms(array.array("h", [1000, -1000] * 240).tobytes()) == 1000
+    assert abs(rms(frame(10000)) - 10000 / math.sqrt(2)) <= 2
+
+
+def test_rms_of_8_and_32_bit_frames():
+    assert rms(array.array("b", [100, -100]).tobytes(), 1) == 100
+    assert rms(array.array("i", [2 ** 30, -2 ** 30]).tobytes(), 4) == 2 ** 30
+
+
+def test_endpointer_finds_an_utterance():
+    endpointer = Endpointer(FRAME_DURATION, end_silence=0.3)
+    seq = 0
+    for _ in range(20):
+        assert endpointer.process(seq, frame(20)) is None  # Learns the noise floor while disarmed
+        seq += 1
+    endpointer.arm()
+    events = []
+    for amplitude in [20] * 5 + [5000] * 20 + [20] * 20:
+        events.append(endpointer.process(seq, frame(amplitude)))
+        seq += 1
+    assert "speech" in events
+    utterance = next(event for event in events if isinstance(event, tuple))
+    _, start_seq, end_seq = utterance
+    assert start_seq < 25 < end_seq
+    assert not endpointer.armed
+
+
+def test_endpointer_times_out_without_speech():
+    endpointer = Endpointer(FRAME_DURATION, start_timeout=0.3)
+    endpointer.arm()
+    events = [endpointer.process(seq, frame(20)) for seq in range(20)]
+    assert events.count("timeout") == 1
+    assert not endpointer.armed
+
+
+def test_failed_microphone_does_not_leave_listening_armed(monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise OSError("no input device")
+
+    monkeypatch.setattr(sr, "Microphone", unavailable)
+    listener = Listener(settings={"microphone": False})
+    messages = []
+    listener.text_received.connect(lambda message, message_type: messages.append((message, message_type)))
+
+    assert listener.toggle_listening() == "Listening"
+    listener.capture.start()
+    listener.capture._thread.join(1)
+    # Armed before the stream failed: listening stops rather than waiting for frames
+    assert not listener.is_listening and not listener.endpointer.armed
+    assert ("", "stop_listening") in messages
+
+    messages.clear()
+    assert listener.toggle_listening() == "NotListening"
+    assert not listener.is_listening and not listener.endpointer.armed
+    assert messages == [("Microphone unavailable: no input device", "error")]
@@ -0,0 +1,168 @@
+import threading
+import time
+import pytest
+from Devices import DeviceRegistry, Device, MqttClient
+from Executor import Executor
+from FakeServices import FakeServices, FakeMqttBroker
+
+API_DELAY = 0.02
+
+
+@pytest.fixture
+def services():
+    services = FakeServices({"api_delay": API_DELAY}).start()
+    yield services
+    services.stop()
+
+
+@pytest.fixture
+def broker():
+    broker = FakeMqttBroker(API_DELAY).start()
+    yield broker
+    broker.stop()
+
+
+@pytest.fixture
+def executor():
+    return Executor({"devices": {"workers": 8, "queue": 16}})
+
+
+def registry(services, broker, executor, debounce=0.1):
+    config = {"devices": {
+        "debounce": debounce,
+        "timeout": 1,
+        "mqtt": {"host": "127.0.0.1", "port": broker.port},
+        "devices": {
+            "lamp": {"name": "lamp", "room": "kitchen", "groups": ["lights"], "driver": "http",
+                     "url": f"{services.url}/devices/lamp"},
+            "strip": {"name": "strip", "room": "kitchen", "groups": ["lights"], "driver": "http",
+                      "on_url": f"{services.url}/devices/strip?turn=on",
+                      "off_url": f"{services.url}/devices/strip?turn=off"},
+            "fan": {"name": "fan", "room": "bedroom", "groups": ["fans", "lights"], "driver": "mqtt",
+                    "topic": "home/fan/set"},
+        }
+    }}
+    return DeviceRegistry.from_config(config, executor)
+
+
+class CountingDriver:
+    """Records every state sent, taking a while per send like a real relay"""
+
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.sent = []
+
+    def send(self, state):
+        self.sent.append(state)
+        time.sleep(self.delay)
+        return True
+
+
+def burst(registry, states, gap=0.03):
+    """Send states to the registry's only device from separate threads, gap seconds apart"""
+    results = [None] * len(states)
+
+    def command(index, state):
+        results[index] = registry.command(registry.devices, state)[0]
+
+    threads = []
+    for index, state in enumerate(states):
+        thread = threading.Thread(target=command, args=(index, state))
+        thread.start()
+        threads.append(thread)
+        time.sleep(gap)
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_http_driver_json_and_url_styles(services, broker, executor):
+    devices = registry(services, broker, executor)
+    kitchen = devices.resolve("kitchen")
+    assert {device.id for device in kitchen} == {"lamp", "strip"}
+    assert devices.command(kitchen, "ON") == ["ON", "ON"]
+    assert services.device_states == {"lamp": "on", "strip": "on"}
+
+
+def test_mqtt_client_publishes_with_qos1(broker):
+    client = MqttClient("127.0.0.1", broker.port, timeout=1)
+    try:
+        assert client.publish("home/fan/set", "ON")
+        assert client.publish("home/fan/set", "OFF")
+    finally:
+        client.close()
+    assert broker.messages == [("home/fan/set", "ON"), ("home/fan/set", "OFF")]
+    assert broker.connections == 1
+
+
+def test_mqtt_client_survives_idle_connection(broker):
+    client = MqttClient("127.0.0.1", broker.port, timeout=0.2)
+    try:
+        assert client.publish("a", "1")
+        time.sleep(0.5)  # Longer than the socket timeout, with nothing to read
+        assert client.publish("a", "2")
+    finally:
+        client.close()
+    assert broker.connections == 1
+
+
+def test_mqtt_client_reconnects_after_missing_acknowledgement(broker):
+    client = MqttClient("127.0.0.1", broker.port, timeout=0.2)
+    try:
+        broker.acknowledge = False
+        started = time.monotonic()
+        assert not client.publish("a", "lost")
+        assert time.monotonic() - started < 1
+        broker.acknowledge = True
+        assert client.publish("a", "delivered")
+    finally:
+        client.close()
+    assert broker.connections == 2
+    assert broker.messages[-1] == ("a", "delivered")
+
+
+def test_group_fans_out_across_drivers_concurrently(services, broker, executor):
+    devices = registry(services, broker, executor)
+    lights = devices.resolve("lights")
+    assert {device.id for device in lights} == {"lamp", "strip", "fan"}
+    started = time.monotonic()
+    assert devices.command(lights, "OFF") == ["OFF", "OFF", "OFF"]
+    # Sent side by side, not one after another
+    assert time.monotonic() - started < API_DELAY * len(lights)
+    assert services.device_states == {"lamp": "off", "strip": "off"}
+    assert broker.messages == [("home/fan/set", "OFF")]
+    devices.close()
+
+
+def test_repeated_command_within_debounce_is_not_resent(executor):
+    driver = CountingDriver(delay=0)
+    devices = DeviceRegistry([Device("lamp", "lamp", "", [], driver)], executor, debounce=0.5)
+    assert devices.command(devices.devices, "ON") == ["ON"]
+    assert devices.command(devices.devices, "ON") == ["ON"]
+    assert driver.sent == ["ON"]
+
+
+def test_rapid_toggles_send_only_the_final_state(executor):
+    driver = CountingDriver()
+    devices = DeviceRegistry([Device("lamp", "lamp", "", [], driver)], executor, debounce=0.1)
+    results = burst(devices, ["ON", "OFF", "ON", "OFF"])
+    assert driver.sent == ["ON", "OFF"]
+    # Every caller hears the state the lamp ended in, including those whose request was overtaken
+    assert results == ["OFF", "OFF", "OFF", "OFF"]
+
+
+def test_toggles_ending_on_the_current_state_send_nothing_more(executor):
+    driver = CountingDriver()
+    devices = DeviceRegistry([Device("lamp", "lamp", "", [], driver)], executor, debounce=0.1)
+    results = burst(devices, ["ON", "OFF", "ON"])
+    assert driver.sent == ["ON"]
+    assert results == ["ON", "ON", "ON"]
+
+
+def test_failed_send_reports_none():
+    class BrokenDriver:
+        def send(self, state):
+            raise ConnectionError("relay unreachable")
+
+    devices = DeviceRegistry([Device("lamp", "lamp", "", [], BrokenDriver())])
+    assert devices.command(devices.devices, "ON") == [None]
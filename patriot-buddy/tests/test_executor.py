@@ -0,0 +1,49 @@
+import threading
+import time
+import pytest
+from Executor import Executor, Stage, StageBusy
+
+
+def test_no_threads_until_work_arrives():
+    executor = Executor()
+    assert all(stats["threads"] == 0 for stats in executor.stats().values())
+
+
+def test_sequential_tasks_reuse_one_thread():
+    stage = Stage("devices", 24, 64)
+    for value in range(5):
+        assert stage.submit(lambda value=value: value).result(timeout=1) == value
+        time.sleep(0.01)  # Let the worker go back to waiting
+    assert stage.stats()["threads"] == 1
+
+
+def test_concurrent_tasks_start_threads_up_to_the_limit():
+    stage = Stage("devices", 4, 16)
+    release = threading.Event()
+    running = []
+
+    def task():
+        running.append(threading.current_thread().name)
+        release.wait(1)
+
+    futures = [stage.submit(task) for _ in range(6)]
+    time.sleep(0.1)
+    # A burst runs side by side rather than behind the first thread
+    assert len(running) == 4
+    release.set()
+    for future in futures:
+        future.result(timeout=1)
+    assert len(running) == 6
+    assert stage.stats()["threads"] == 4
+
+
+def test_full_queue_is_rejected():
+    stage = Stage("listen", 1, 1)
+    release = threading.Event()
+    stage.submit(release.wait, 1)
+    time.sleep(0.05)  # The only thread is now busy
+    stage.submit(release.wait, 1)
+    with pytest.raises(StageBusy):
+        stage.submit(release.wait, 1)
+    release.set()
+    assert stage.stats()["rejected"] == 1
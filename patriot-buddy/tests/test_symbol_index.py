@@ -0,0 +1,66 @@
+import os
+import pytest
+from SymbolIndex import SymbolIndex, build
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SYMBOLS_CSV = os.path.join(ROOT, "symbols.csv")
+SYMBOLS_INDEX = os.path.join(ROOT, "symbols.idx")
+
+
+@pytest.fixture(scope="module")
+def index():
+    return SymbolIndex(build(SYMBOLS_CSV))
+
+
+def test_committed_index_matches_csv():
+    with open(SYMBOLS_INDEX, "rb") as f:
+        assert f.read() == build(SYMBOLS_CSV), "run: python patriot-buddy/SymbolIndex.py build"
+
+
+def test_load_maps_the_built_file(tmp_path):
+    index = SymbolIndex.load(str(tmp_path / "symbols.idx"), SYMBOLS_CSV)
+    assert (tmp_path / "symbols.idx").exists()
+    assert index.match("apple") == "AAPL"
+
+
+@pytest.mark.parametrize("text, ticker", [
+    ("AAPL", "AAPL"),
+    ("brk.b", "BRK.B"),
+    ("what's IBM trading at", "IBM"),
+    ("how is apple stock doing", "AAPL"),
+    ("how's microsoft doing", "MSFT"),
+    ("microsoft", "MSFT"),
+    ("Microsoft Corporation", "MSFT"),
+    ("how's bank of america doing today", "BAC"),
+    ("coca-cola stock", "KO"),
+    ("j&j", "JNJ"),
+    ("mcdonald's stock", "MCD"),
+    ("how is the stock market doing", "SPY"),
+])
+def test_names_aliases_and_tickers(index, text, ticker):
+    assert index.match(text) == ticker
+
+
+@pytest.mark.parametrize("text, ticker", [
+    ("qualcom", "QCOM"),
+    ("micros", "MSFT"),
+    ("micrsoft shares", "MSFT"),
+    ("netflx", "NFLX"),
+    ("how is nvidea doing", "NVDA"),
+])
+def test_long_prefixes_and_misspellings(index, text, ticker):
+    assert index.match(text) == ticker
+
+
+@pytest.mark.parametrize("text", [
+    "check the price of gold",  # Not Goldman Sachs
+    "how are banks doing",  # Not Bank of America
+    "aple",  # Too short to guess at
+    "micr",
+    "what's the weather",
+    "how is it doing",
+    "a stock",
+    "what is ZETA at",  # An unknown ticker is not a misspelled name
+])
+def test_short_or_partial_words_do_not_match(index, text):
+    assert index.match(text) is None